@@ -0,0 +1,44 @@
+"""product full-text and trigram search
+
+Revision ID: 021cef4ebb31
+Revises:
+Create Date: 2026-10-16 10:00:00
+
+"""
+from alembic import op
+
+
+revision = '021cef4ebb31'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    ''' Взвешенный tsvector: название важнее серии, серия важнее описания '''
+    op.execute("""
+        ALTER TABLE products ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(series, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.execute('CREATE INDEX ix_products_search_vector ON products USING GIN (search_vector)')
+
+    ''' Триграммы для частичных названий (ILIKE '%zaku%', word_similarity) '''
+    op.execute('CREATE INDEX ix_products_name_trgm ON products USING GIN (name gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_products_name_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_products_search_vector')
+    op.execute('ALTER TABLE products DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,28 @@
+"""catalog version counter for cache invalidation
+
+Revision ID: 5e1a7d3b2f90
+Revises: 9c2c4e80fb7c
+Create Date: 2026-10-16 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5e1a7d3b2f90'
+down_revision = '9c2c4e80fb7c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    catalog_versions = op.create_table(
+        'catalog_versions',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(catalog_versions, [{'name': 'catalog', 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_versions')
@@ -0,0 +1,42 @@
+"""review moderation columns and composite indexes for hot access paths
+
+Revision ID: 7b3d9f1c2a64
+Revises: 5e1a7d3b2f90
+Create Date: 2026-10-16 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7b3d9f1c2a64'
+down_revision = '5e1a7d3b2f90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('reviews', sa.Column('is_approved', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('reviews', sa.Column('is_hidden', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    op.create_index(
+        'ix_reviews_product_moderation_created', 'reviews',
+        ['product_id', 'is_approved', 'is_hidden', 'created_at']
+    )
+    op.create_index('ix_review_helpfuls_review_user', 'review_helpfuls', ['review_id', 'user_id'])
+    op.create_index('ix_orders_user_created', 'orders', ['user_id', 'created_at'])
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+    op.create_index('ix_order_items_product_id', 'order_items', ['product_id'])
+    op.create_index('ix_cart_user_product', 'cart', ['user_id', 'product_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cart_user_product', table_name='cart')
+    op.drop_index('ix_order_items_product_id', table_name='order_items')
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_index('ix_orders_user_created', table_name='orders')
+    op.drop_index('ix_review_helpfuls_review_user', table_name='review_helpfuls')
+    op.drop_index('ix_reviews_product_moderation_created', table_name='reviews')
+
+    op.drop_column('reviews', 'is_hidden')
+    op.drop_column('reviews', 'is_approved')
@@ -0,0 +1,22 @@
+"""index on products.updated_at for catalog snapshot refresh
+
+Revision ID: 9c2c4e80fb7c
+Revises: 021cef4ebb31
+Create Date: 2026-10-16 11:00:00
+
+"""
+from alembic import op
+
+
+revision = '9c2c4e80fb7c'
+down_revision = '021cef4ebb31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_updated_at', 'products', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_updated_at', table_name='products')
@@ -0,0 +1,100 @@
+"""monthly range partitioning of view_history by viewed_at
+
+Revision ID: b4e8a2d61c35
+Revises: 7b3d9f1c2a64
+Create Date: 2026-10-16 14:00:00
+
+"""
+from alembic import op
+
+
+revision = 'b4e8a2d61c35'
+down_revision = '7b3d9f1c2a64'
+branch_labels = None
+depends_on = None
+
+
+VIEW_HISTORY_INDEXES = (
+    ('ix_view_history_user_id', ['user_id']),
+    ('ix_view_history_product_id', ['product_id']),
+    ('ix_view_history_viewed_at', ['viewed_at']),
+    ('ix_view_history_user_viewed', ['user_id', 'viewed_at']),
+)
+
+
+def _rename_to_legacy() -> None:
+    op.execute('ALTER TABLE view_history RENAME TO view_history_legacy')
+    op.execute('ALTER TABLE view_history_legacy RENAME CONSTRAINT view_history_pkey TO view_history_legacy_pkey')
+    for name, _ in VIEW_HISTORY_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def _create_indexes() -> None:
+    for name, columns in VIEW_HISTORY_INDEXES:
+        op.create_index(name, 'view_history', columns)
+
+
+def upgrade() -> None:
+    _rename_to_legacy()
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute("""
+        CREATE TABLE view_history (
+            id UUID NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            product_id UUID NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+            viewed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, viewed_at)
+        ) PARTITION BY RANGE (viewed_at)
+    """)
+    _create_indexes()
+
+    # Секции на все месяцы существующих данных и два месяца вперед (дальше их создает приложение)
+    op.execute("""
+        DO $$
+        DECLARE
+            month date := date_trunc('month', coalesce((SELECT min(viewed_at) FROM view_history_legacy), now()))::date;
+            last_month date := date_trunc(
+                'month', greatest((SELECT max(viewed_at) FROM view_history_legacy), now() + interval '2 months')
+            )::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF view_history FOR VALUES FROM (%L) TO (%L)',
+                    'view_history_p' || to_char(month, 'YYYYMM'), month, (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    # Строки вне созданных секций (если обслуживание отстало) попадают сюда, а не в ошибку вставки
+    op.execute('CREATE TABLE view_history_default PARTITION OF view_history DEFAULT')
+
+    op.execute("""
+        INSERT INTO view_history (id, user_id, product_id, viewed_at)
+        SELECT id, user_id, product_id, viewed_at FROM view_history_legacy
+    """)
+    op.execute('DROP TABLE view_history_legacy')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE view_history RENAME TO view_history_partitioned')
+    op.execute('ALTER TABLE view_history_partitioned RENAME CONSTRAINT view_history_pkey TO view_history_partitioned_pkey')
+    for name, _ in VIEW_HISTORY_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    op.execute("""
+        CREATE TABLE view_history (
+            id UUID PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            product_id UUID NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+            viewed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    _create_indexes()
+
+    op.execute("""
+        INSERT INTO view_history (id, user_id, product_id, viewed_at)
+        SELECT id, user_id, product_id, viewed_at FROM view_history_partitioned
+    """)
+    op.execute('DROP TABLE view_history_partitioned')
@@ -0,0 +1,43 @@
+"""server-side defaults for ids and timestamps (returned by INSERT ... RETURNING)
+
+Revision ID: c7f1e9a3b5d2
+Revises: b4e8a2d61c35
+Create Date: 2026-10-16 15:00:00
+
+"""
+from alembic import op
+
+
+revision = 'c7f1e9a3b5d2'
+down_revision = 'b4e8a2d61c35'
+branch_labels = None
+depends_on = None
+
+
+# Таблицы на BaseModel: id, created_at, updated_at
+BASE_MODEL_TABLES = ('users', 'products', 'orders', 'order_items', 'cart', 'reviews', 'review_helpfuls')
+
+
+def upgrade() -> None:
+    # gen_random_uuid() встроена начиная с PostgreSQL 13
+    for table in BASE_MODEL_TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid()')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT now()')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN updated_at SET DEFAULT now()')
+
+    op.execute('ALTER TABLE view_history ALTER COLUMN id SET DEFAULT gen_random_uuid()')
+    op.execute('ALTER TABLE view_history ALTER COLUMN viewed_at SET DEFAULT now()')
+    op.execute('ALTER TABLE favorites ALTER COLUMN id SET DEFAULT gen_random_uuid()')
+    op.execute('ALTER TABLE favorites ALTER COLUMN created_at SET DEFAULT now()')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE favorites ALTER COLUMN created_at DROP DEFAULT')
+    op.execute('ALTER TABLE favorites ALTER COLUMN id DROP DEFAULT')
+    op.execute('ALTER TABLE view_history ALTER COLUMN viewed_at DROP DEFAULT')
+    op.execute('ALTER TABLE view_history ALTER COLUMN id DROP DEFAULT')
+
+    for table in BASE_MODEL_TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN updated_at DROP DEFAULT')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at DROP DEFAULT')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT')
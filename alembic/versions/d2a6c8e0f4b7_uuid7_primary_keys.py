@@ -0,0 +1,51 @@
+"""time-ordered UUIDv7 defaults for primary keys
+
+Revision ID: d2a6c8e0f4b7
+Revises: c7f1e9a3b5d2
+Create Date: 2026-10-16 16:00:00
+
+Существующие строки не переписываются: ключи уже разошлись по внешним ключам, кешам и URL,
+а UUIDv4 и UUIDv7 уникальны вместе. Новые строки получают UUIDv7 (приложение генерирует id само,
+uuid_generate_v7() - умолчание для вставок в обход ORM), и вставки идут в правый край индекса.
+Старая, случайно заполненная часть индекса со временем уходит в историю; при необходимости
+ее можно уплотнить REINDEX INDEX CONCURRENTLY <table>_pkey.
+"""
+from alembic import op
+
+
+revision = 'd2a6c8e0f4b7'
+down_revision = 'c7f1e9a3b5d2'
+branch_labels = None
+depends_on = None
+
+
+TABLES = (
+    'users', 'products', 'orders', 'order_items', 'cart', 'reviews', 'review_helpfuls',
+    'view_history', 'favorites',
+)
+
+UUID7_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE
+"""
+
+
+def upgrade() -> None:
+    op.execute(UUID7_FUNCTION)
+    for table in TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id SET DEFAULT uuid_generate_v7()')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid()')
+    op.execute('DROP FUNCTION uuid_generate_v7()')
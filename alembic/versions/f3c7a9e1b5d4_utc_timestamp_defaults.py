@@ -0,0 +1,46 @@
+"""UTC timestamp defaults: timezone('utc', statement_timestamp()) instead of now()
+
+Revision ID: f3c7a9e1b5d4
+Revises: e5b9d3f7a1c8
+Create Date: 2026-10-16 18:00:00
+
+"""
+from alembic import op
+
+
+revision = 'f3c7a9e1b5d4'
+down_revision = 'e5b9d3f7a1c8'
+branch_labels = None
+depends_on = None
+
+
+# Таблицы на BaseModel: created_at, updated_at
+BASE_MODEL_TABLES = ('users', 'products', 'orders', 'order_items', 'cart', 'reviews', 'review_helpfuls')
+
+# Колонки DateTime без часового пояса, которые заполняет БД
+TIMESTAMP_COLUMNS = (
+    *((table, column) for table in BASE_MODEL_TABLES for column in ('created_at', 'updated_at')),
+    ('view_history', 'viewed_at'),
+    ('favorites', 'created_at'),
+)
+
+
+def upgrade() -> None:
+    # now() записывал в колонки без пояса локальное время сессии; если сервер не в UTC - переводим в UTC
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF current_setting('TimeZone') NOT IN ('UTC', 'Etc/UTC', 'GMT', 'Etc/GMT') THEN
+                    UPDATE {table} SET {column} = timezone('utc', {column}::timestamptz);
+                END IF;
+            END $$
+        """)
+
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT timezone('utc', statement_timestamp())")
+
+
+def downgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT now()')
@@ -6,10 +6,46 @@ from dotenv import find_dotenv
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # По умолчанию DATABASE_URL с драйвером asyncpg
+    # Пул соединений (на каждый движок: sync, async и каждую реплику).
+    # Максимум соединений с сервера БД: воркеры gunicorn * движки * (POOL_SIZE + MAX_OVERFLOW)
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0  # Сколько ждать свободное соединение, секунд
+    DATABASE_POOL_RECYCLE: int = 300  # Переподключение через N секунд (-1 - без ограничения)
+    DATABASE_POOL_PRE_PING: bool = True  # Проверка соединения перед выдачей
+    DATABASE_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # Серверные prepared statements asyncpg на соединение
+    # Статистика SQL на запрос (заголовки X-DB-Queries / X-DB-Time-Ms) и лог медленных запросов
+    SQL_SLOW_QUERY_SECONDS: float = 0.5
+    SQL_SLOW_QUERY_SAMPLE_RATE: float = 0.1  # Доля медленных запросов, попадающих в лог
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5  # В DEBUG: столько одинаковых запросов за HTTP-запрос - подозрение на N+1
+    # Реплики только для чтения (через запятую); GET-запросы идут на них, запись - на primary
+    DATABASE_REPLICA_URLS: str = ""
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 5.0  # Реплика с большим отставанием исключается
+    DATABASE_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0  # Как часто проверять доступность и отставание
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30.0  # Сколько не использовать недоступную реплику
+    DATABASE_REPLICA_STICKY_SECONDS: int = 5  # Сколько после записи клиент читает с primary (Bearer-клиенты - только в том же воркере)
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Кеш пользователей по subject токена (без SELECT users на каждый запрос).
+    # Изменения пользователя сбрасывают запись в своем процессе, в остальных она живет не дольше TTL
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000  # 0 - кеш выключен
+    TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS: float = 10.0  # Как часто подтягивать отозванные токены из БД
+    TOKEN_CACHE_MAX_SIZE: int = 10000  # Декодированных JWT в LRU кеше (0 - кеш выключен)
+    # Пароли: bcrypt в пуле процессов (при смене стоимости хеш пересчитывается при следующем входе)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # Процессов в пуле на воркер
+    PASSWORD_HASH_MAX_PENDING: int = 16  # Операций в работе и в очереди пула; сверх - ожидание допуска
+    PASSWORD_HASH_ADMISSION_TIMEOUT_SECONDS: float = 2.0  # Не дождались допуска - 503 с Retry-After
+    # Ограничение неудачных входов (скользящее окно в памяти процесса); сверх лимита - 429 без проверки пароля
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = 300.0
+    LOGIN_THROTTLE_IP_LIMIT: int = 30  # Неудачных входов с одного IP за окно
+    LOGIN_THROTTLE_ACCOUNT_LIMIT: int = 10  # Неудачных входов в один аккаунт за окно
+    LOGIN_THROTTLE_SHARDS: int = 16
+    LOGIN_THROTTLE_MAX_KEYS: int = 50000  # На каждый ограничитель; при переполнении вытесняются старые ключи
 
     # File uploads
     UPLOAD_DIR: str = "app/static/uploads"
@@ -20,6 +56,34 @@ class Settings(BaseSettings):
     DEFAULT_PAGE_SIZE: int = 12
     MAX_PAGE_SIZE: int = 100
 
+    # Снимок каталога в памяти процесса (списки товаров без запросов к БД)
+    CATALOG_SNAPSHOT_ENABLED: bool = True
+    CATALOG_SNAPSHOT_TTL_SECONDS: float = 5.0  # Как часто сверяться с БД по updated_at
+    CATALOG_SNAPSHOT_WATERMARK_OVERLAP_SECONDS: float = 60.0  # Запас на транзакции, закоммиченные позже своей отметки updated_at
+
+    # HTTP-кеширование товаров (ETag + Cache-Control, пустая строка - без Cache-Control)
+    PRODUCT_CACHE_CONTROL: str = "public, max-age=60"
+    PRODUCT_LIST_CACHE_CONTROL: str = "public, max-age=10"
+
+    # Максимум товаров в одном запросе /products/batch
+    PRODUCT_BATCH_MAX_IDS: int = 100
+
+    # Размер предрасчитанных списков "рекомендуемые" и "новинки"
+    PRODUCT_TOP_LIST_SIZE: int = 50
+
+    # Помесячные секции view_history (PostgreSQL)
+    VIEW_HISTORY_PARTITIONS_AHEAD: int = 2  # Сколько будущих месяцев создавать заранее
+    VIEW_HISTORY_MAINTENANCE_INTERVAL_SECONDS: float = 6 * 3600
+    VIEW_HISTORY_RETENTION_DAYS: Optional[int] = None  # Автоматически удалять секции старше N дней (None - не удалять)
+    VIEW_HISTORY_LOOKBACK_DAYS: int = 90  # Глубина истории пользователя, если срок хранения не задан (запрос читает только свежие секции)
+
+    # Мониторинг задержки event loop (блокирующий код в async-обработчиках)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.05  # Период контрольной задачи
+    LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS: float = 0.1  # Блокировка дольше порога попадает в историю
+    LOOP_MONITOR_HISTORY_SIZE: int = 100
+    LOOP_MONITOR_STACK_DEPTH: int = 15
+
     CLICK_SERVICE_ID: Optional[str]
     CLICK_SECRET_KEY: Optional[str]
     PAYME_MERCHANT_ID: Optional[str]
@@ -1,29 +1,236 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from prometheus_client import Counter, Gauge
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
+from app.utils.db_routing import prefers_primary
+from app.utils.pool_metrics import TimedAsyncQueuePool, TimedQueuePool, register_pool_gauges
+
+logger = logging.getLogger(__name__)
+
+
+# Параметры пула из настроек; name - label пула в метриках
+def engine_options(name: str, is_async: bool = False) -> dict:
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+
 
 # Создание движка базы данных
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=True,  # Логирование SQL запросов (отключи в продакшене)
-    pool_pre_ping=True,  # Проверка соединения
-    pool_recycle=300,    # Переподключение каждые 5 минут
+    **engine_options("primary")
 )
+register_pool_gauges(engine, "primary")
+
+# Создание сессии; expire_on_commit=False - объекты можно читать после commit без refresh и запроса к БД
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+# Адрес с драйвером asyncpg для postgresql.
+# asyncpg выполняет запросы через серверные prepared statements; кеш подготовленных запросов на соединение
+# должен вмещать все горячие запросы, иначе они будут подготавливаться заново
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE)}
+        )
+    return url.render_as_string(hide_password=False)
+
+
+# Адрес для асинхронного движка: ASYNC_DATABASE_URL или DATABASE_URL с драйвером asyncpg
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return to_async_url(settings.DATABASE_URL)
+
+
+# Асинхронный движок (запросы не блокируют event loop)
+async_engine = create_async_engine(
+    get_async_database_url(),
+    **engine_options("primary_async", is_async=True)
+)
+register_pool_gauges(async_engine.sync_engine, "primary_async")
+
+# Асинхронная сессия; expire_on_commit=False - объекты можно читать после commit без запроса к БД
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# Метрики маршрутизации чтений
+DB_SESSIONS_TOTAL = Counter("db_sessions_total", "Открытые сессии БД по цели", ["target"])
+REPLICA_LAG_SECONDS = Gauge("db_replica_lag_seconds", "Отставание реплики от primary", ["replica"])
+REPLICA_AVAILABLE = Gauge("db_replica_available", "Реплика используется для чтения (1/0)", ["replica"])
+
+# Отставание реплики: 0, если все полученные WAL уже применены (иначе простаивающий primary выглядел бы как лаг)
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    """Реплика только для чтения: движки, фабрики сессий и состояние здоровья"""
+
+    def __init__(self, url: str):
+        parsed = make_url(url)
+        self.name = f"{parsed.host or 'localhost'}/{parsed.database}"
+        self.engine = create_engine(url, **engine_options(self.name))
+        self.async_engine = create_async_engine(to_async_url(url), **engine_options(f"{self.name}_async", is_async=True))
+        register_pool_gauges(self.engine, self.name)
+        register_pool_gauges(self.async_engine.sync_engine, f"{self.name}_async")
+        self.session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self.async_session = async_sessionmaker(
+            self.async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.lag = 0.0
+        self.down_until = 0.0
 
-# Создание сессии
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until and self.lag <= settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaSet:
+    """Выбор реплики для чтения: round-robin по доступным, исключение отстающих и упавших"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    # Доступные реплики, начиная со следующей по кругу
+    def candidates(self) -> List[Replica]:
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            return []
+        start = next(self._counter) % len(available)
+        return available[start:] + available[:start]
+
+    # Реплика не отвечает: не используем её DATABASE_REPLICA_RETRY_SECONDS
+    def mark_down(self, replica: Replica, error: Exception):
+        replica.down_until = time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+        REPLICA_AVAILABLE.labels(replica=replica.name).set(0)
+        logger.warning("Реплика %s недоступна, чтения идут на primary/другие реплики: %s", replica.name, error)
+
+    # Проверка доступности и отставания всех реплик
+    async def check(self):
+        for replica in self.replicas:
+            try:
+                async with replica.async_engine.connect() as conn:
+                    lag = 0.0
+                    if replica.async_engine.dialect.name == "postgresql":
+                        lag = float(await conn.scalar(REPLICA_LAG_SQL) or 0)
+            except (DBAPIError, OSError) as e:
+                self.mark_down(replica, e)
+                continue
+
+            replica.lag = lag
+            replica.down_until = 0.0
+            REPLICA_LAG_SECONDS.labels(replica=replica.name).set(lag)
+            REPLICA_AVAILABLE.labels(replica=replica.name).set(int(replica.available))
+            if not replica.available:
+                logger.warning("Реплика %s отстает на %.1f с и исключена из чтений", replica.name, lag)
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DATABASE_REPLICA_CHECK_INTERVAL_SECONDS)
+
+    # Фоновая проверка реплик (запускается при старте приложения)
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+replica_set = ReplicaSet([url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()])
 
 # Базовый класс для моделей
 Base = declarative_base()
 
+
+# Сессия для запроса: реплика для безопасных методов, иначе (или если все реплики недоступны) - primary
+def open_session(request: Request) -> Session:
+    if not prefers_primary(request):
+        for replica in replica_set.candidates():
+            db = replica.session()
+            try:
+                db.connection()
+            except (DBAPIError, OSError) as e:
+                db.close()
+                replica_set.mark_down(replica, e)
+                continue
+            db.info["replica"] = replica.name
+            DB_SESSIONS_TOTAL.labels(target="replica").inc()
+            return db
+
+    DB_SESSIONS_TOTAL.labels(target="primary").inc()
+    return SessionLocal()
+
+
+async def open_async_session(request: Request) -> AsyncSession:
+    if not prefers_primary(request):
+        for replica in replica_set.candidates():
+            db = replica.async_session()
+            try:
+                await db.connection()
+            except (DBAPIError, OSError) as e:
+                await db.close()
+                replica_set.mark_down(replica, e)
+                continue
+            db.info["replica"] = replica.name
+            DB_SESSIONS_TOTAL.labels(target="replica").inc()
+            return db
+
+    DB_SESSIONS_TOTAL.labels(target="primary").inc()
+    return AsyncSessionLocal()
+
+
 # Зависимость для получения сессии БД
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    db = open_session(request)
     try:
         yield db
     except Exception:
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Зависимость для получения асинхронной сессии БД.
+# Синхронный код сервисов (ProductService, HistoryService, AdminService) вызывается через
+# await db.run_sync(...): запросы идут через asyncpg и тоже не блокируют event loop
+async def get_async_db(request: Request):
+    async with await open_async_session(request) as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
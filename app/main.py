@@ -9,6 +9,14 @@ from app.config import settings
 from app.routers import payments
 from app.routers import user
 from app.routers import admin
+from app.routers import monitoring
+from app.utils.loop_monitor import loop_monitor
+from app.utils.db_routing import PrimaryStickinessMiddleware
+from app.utils.sql_stats import SqlStatsMiddleware
+from app.database import replica_set
+from app.services.history_partitions import view_history_maintenance
+from app.services.token_revocation import revocation_list
+from app.services.password_hasher import password_hasher
 
 
 # Создание приложения FastAPI
@@ -18,6 +26,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Чтения клиента после его записи идут на primary (read-your-writes при репликах)
+app.add_middleware(PrimaryStickinessMiddleware)
+
+# Количество и время SQL запросов на запрос (заголовки X-DB-*, метрики, поиск N+1 в DEBUG)
+app.add_middleware(SqlStatsMiddleware)
+
 # Подключение статических файлов
 # app.mount("/node", StaticFiles(directory="app/static"), name="static")
 
@@ -31,6 +45,52 @@ app.include_router(favorites_router, prefix="/favorites")
 app.include_router(payments.router, prefix="/api/payments")
 app.include_router(user.router, prefix="/profile")
 app.include_router(admin.router, prefix="/admin")
+app.include_router(monitoring.router)
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    loop_monitor.start(app)
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+
+@app.on_event("startup")
+async def start_replica_checks():
+    replica_set.start()
+
+
+@app.on_event("shutdown")
+async def stop_replica_checks():
+    await replica_set.stop()
+
+
+@app.on_event("startup")
+async def start_view_history_maintenance():
+    view_history_maintenance.start()
+
+
+@app.on_event("shutdown")
+async def stop_view_history_maintenance():
+    await view_history_maintenance.stop()
+
+
+@app.on_event("startup")
+async def start_token_revocation_sync():
+    revocation_list.start()
+
+
+@app.on_event("shutdown")
+async def stop_token_revocation_sync():
+    await revocation_list.stop()
+
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
 
 @app.get("/")
 async def root():
@@ -4,6 +4,8 @@ from app.models.product import GradeEnum, Product
 from app.models.order import OrderStatusEnum, Order, OrderItem, Cart
 from app.models.review import Review, ReviewHelpful
 from app.models.history import ViewHistory, Favorites
+from app.models.catalog import CatalogVersion
+from app.models.token import TokenRevocation
 
 
 ''' Экспортируем все модели для удобного импорта '''
@@ -13,5 +15,7 @@ __all__ = [
     "GradeEnum", "Product",
     "OrderStatusEnum", "Order", "OrderItem", "Cart",
     "Review", "ReviewHelpful",
-    "ViewHistory", "Favorites"
+    "ViewHistory", "Favorites",
+    "CatalogVersion",
+    "TokenRevocation"
 ]
\ No newline at end of file
@@ -1,15 +1,29 @@
-import uuid
-from datetime import datetime, timezone
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DDL, DateTime, event, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
+from app.utils.uuid7 import UUID7_SQL_FUNCTION, uuid7
+
+
+''' Функция uuid_generate_v7() нужна до создания таблиц через create_all (в миграциях создается отдельно) '''
+event.listen(Base.metadata, "before_create", DDL(UUID7_SQL_FUNCTION).execute_if(dialect="postgresql"))
+
+
+''' Единые часы для всех отметок времени: UTC в колонках DateTime без часового пояса, независимо от TimeZone сессии.
+    statement_timestamp(), а не now(): now() - время начала транзакции, и отметка долгой транзакции
+    оказывалась бы позади уже видимых строк (инкрементное обновление по updated_at их пропускало бы) '''
+def utc_now():
+    return func.timezone('utc', func.statement_timestamp())
 
 
 ''' Базовая модель для упрощения кода '''
 class BaseModel(Base):
     __abstract__ = True # Указывает, что класс не будет создавать отдельную таблицу
 
+    ''' Время генерирует БД; значения возвращаются тем же INSERT/UPDATE ... RETURNING (без refresh).
+        id - UUIDv7 (растет со временем): приложение генерирует его само, uuid_generate_v7() - для вставок в обход ORM '''
+    __mapper_args__ = {"eager_defaults": True}
+
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4) # Генерируем уникальное ID
-    created_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False) # Время создания
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc), nullable=False) # Время обновления
\ No newline at end of file
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7, server_default=text("uuid_generate_v7()")) # Генерируем уникальное ID
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False) # Время создания (UTC)
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now(), nullable=False) # Время обновления (UTC)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger
+from app.database import Base
+
+
+''' Таблица версий каталога (увеличивается при каждом изменении товаров) '''
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    name = Column(String(50), primary_key=True) # Ключ версии (например, "catalog")
+    version = Column(BigInteger, default=0, nullable=False) # Номер версии
+
+
+    ''' Пример отображения объекта '''
+    def __repr__(self):
+        return f"<CatalogVersion(name='{self.name}', version={self.version})>"
@@ -1,19 +1,19 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy import Column, DDL, DateTime, ForeignKey, Index, event, text
 from sqlalchemy.dialects.postgresql import UUID
-import uuid
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 from app.database import Base
+from app.models.base import utc_now
+from app.utils.uuid7 import uuid7
 
 
-''' История просмотренных товаров пользователя '''
+''' История просмотренных товаров пользователя (в PostgreSQL секционирована по месяцам viewed_at) '''
 class ViewHistory(Base):
     __tablename__ = "view_history"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)  # Генерируем уникальное ID
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7, server_default=text("uuid_generate_v7()"))  # UUIDv7: вставки в конец индекса
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
-    viewed_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
+    viewed_at = Column(DateTime, primary_key=True, server_default=utc_now(), nullable=False)  # Ключ секционирования входит в первичный ключ
 
     ''' Создаем связь между таблицами User и Product '''
     user = relationship("User", back_populates="view_history")
@@ -25,17 +25,29 @@ class ViewHistory(Base):
         Index('ix_view_history_product_id', 'product_id'), # используются в фильтрах
         Index('ix_view_history_viewed_at', 'viewed_at'), # используется для сортировки по времени
         Index('ix_view_history_user_viewed', 'user_id', 'viewed_at'),  # для ускорения сортировки по времени просмотров конкретного пользователя
+        {'postgresql_partition_by': 'RANGE (viewed_at)'},  # секции создает ViewHistoryPartitions
     )
 
+    ''' viewed_at (время БД) возвращается тем же INSERT; ключ записи - (id, viewed_at), как в таблице,
+        поэтому UPDATE/DELETE по ключу затрагивают одну секцию '''
+    __mapper_args__ = {'eager_defaults': True}
+
+
+''' Секция по умолчанию: просмотр сохраняется, даже если секция месяца еще не создана '''
+event.listen(
+    ViewHistory.__table__, "after_create",
+    DDL("CREATE TABLE view_history_default PARTITION OF view_history DEFAULT").execute_if(dialect="postgresql")
+)
+
 
 '''  Избранные товары пользователя '''
 class Favorites(Base):
     __tablename__ = "favorites"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)  # Генерируем уникальное ID
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7, server_default=text("uuid_generate_v7()"))  # UUIDv7: вставки в конец индекса
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
 
     ''' Создаем связь между таблицами User и Product '''
     user = relationship("User", back_populates="favorites")
@@ -47,4 +59,7 @@ class Favorites(Base):
         Index('ix_favorites_product_id', 'product_id'), # используются в фильтрах
         Index('uq_user_product_favorite', 'user_id', 'product_id', unique=True), # Установка, что каждый пользователь может добавить в избранное один и тот же товар только один раз
 
-    )
\ No newline at end of file
+    )
+
+    ''' id и created_at возвращаются тем же INSERT ... RETURNING '''
+    __mapper_args__ = {'eager_defaults': True}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DECIMAL, Integer, ForeignKey, Enum, DateTime, Text
+from sqlalchemy import Column, String, DECIMAL, Integer, ForeignKey, Enum, DateTime, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.models import BaseModel
@@ -30,6 +30,11 @@ class Order(BaseModel):
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
 
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_orders_user_created', 'user_id', 'created_at'), # заказы пользователя по дате
+    )
+
     ''' Пример отображения объекта '''
     def __repr__(self):
         return f"<Order(id='{self.id}', status='{self.status.value}')>"
@@ -48,6 +53,12 @@ class OrderItem(BaseModel):
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_order_items_order_id', 'order_id'), # позиции заказа
+        Index('ix_order_items_product_id', 'product_id'), # продажи товара
+    )
+
     ''' Пример отображения объекта '''
     def __repr__(self):
         return f"<OrderItem(product_id='{self.product_id}', quantity={self.quantity})>"
@@ -65,6 +76,11 @@ class Cart(BaseModel):
     user = relationship("User", back_populates="cart_items")
     product = relationship("Product", back_populates="cart_items")
 
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_cart_user_product', 'user_id', 'product_id'), # корзина пользователя и проверка товара в ней
+    )
+
     ''' Пример отображения объекта '''
     def __repr__(self):
         return f"<Cart(user_id='{self.user_id}', product_id='{self.product_id}')>"
\ No newline at end of file
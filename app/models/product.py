@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, DECIMAL, Integer, JSON, Enum
+from sqlalchemy import Column, Computed, DDL, String, Text, DECIMAL, Integer, JSON, Enum, Index, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.models import BaseModel
 import enum
@@ -36,12 +37,31 @@ class Product(BaseModel):
     average_rating = Column(DECIMAL(3, 2), default=0.0) # Средний рейтинг
     total_reviews = Column(Integer, default=0) # Общее количество отзывов
 
-    ''' Создаем связь между таблицами OrderItem, Cart, Review, ViewHistory, Favorite '''
+    ''' Поиск: взвешенный tsvector (название важнее серии, серия важнее описания), генерирует БД.
+        Колонка есть только в таблице (exclude_properties): ORM не читает ее ни в SELECT, ни в INSERT/UPDATE ... RETURNING,
+        условия поиска обращаются к Product.__table__.c.search_vector '''
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(series, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+        persisted=True
+    ))
+
+    ''' Создаем связь между таблицами OrderItem, Cart, Review, ViewHistory, Favorites '''
     order_items = relationship("OrderItem", back_populates="product")
     cart_items = relationship("Cart", back_populates="product")
     reviews = relationship("Review", back_populates="product")
     view_history = relationship("ViewHistory", back_populates="product")
-    favorites = relationship("Favorite", back_populates="product")
+    favorites = relationship("Favorites", back_populates="product")
+
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_products_updated_at', 'updated_at'), # инкрементальное обновление снимка каталога
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'), # полнотекстовый поиск
+        Index('ix_products_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}), # частичные названия (ILIKE, word_similarity)
+    )
+
+    __mapper_args__ = {**BaseModel.__mapper_args__, 'exclude_properties': ['search_vector']}
 
 
     ''' Пример отображения объекта '''
@@ -64,4 +84,8 @@ class Product(BaseModel):
     ''' Отформатированная цена '''
     @property
     def formatted_price(self):
-        return f"{self.price:,.0f}".replace(",", " ")
\ No newline at end of file
+        return f"{self.price:,.0f}".replace(",", " ")
+
+
+''' pg_trgm нужен триграммному индексу до создания таблицы через create_all (в миграциях создается отдельно) '''
+event.listen(Product.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, Text, JSON, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Text, JSON, ForeignKey, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from app.models import BaseModel
 
 
@@ -13,10 +13,18 @@ class Review(BaseModel):
     rating = Column(Integer, nullable=False)  # Рейтинг товара (1-5)
     comment = Column(Text, nullable=True) # Комментарии к товару
     images = Column(JSON, nullable=True)  # JSON-структура с массива путей к изображениям
+    is_approved = Column(Boolean, default=True, nullable=False) # Модерация: отзыв одобрен
+    is_hidden = Column(Boolean, default=False, nullable=False) # Модерация: отзыв скрыт
 
-    ''' Создаем связь между таблицами User, Product '''
+    ''' Создаем связь между таблицами User, Product, ReviewHelpful '''
     user = relationship("User", back_populates="reviews")
     product = relationship("Product", back_populates="reviews")
+    helpful_votes = relationship("ReviewHelpful", back_populates="review")
+
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_reviews_product_moderation_created', 'product_id', 'is_approved', 'is_hidden', 'created_at'), # отзывы товара и их статистика
+    )
 
 
     ''' Пример отображения объекта '''
@@ -30,11 +38,17 @@ class ReviewHelpful(BaseModel):
     review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.id"), nullable=False) # ID отзыва
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False) # ID пользователя
     helpful = Column(Boolean, nullable=False)  # True, если отзыв был полезным, иначе False
+    is_helpful = synonym('helpful')  # имя, под которым голос читают сервис и схемы отзывов
 
     ''' Создаем связь между таблицами Review, User '''
     review = relationship("Review", back_populates="helpful_votes")
     user = relationship("User", back_populates="helpful_reviews")
 
+    ''' Индексы для повышения производительности запросов '''
+    __table_args__ = (
+        Index('ix_review_helpfuls_review_user', 'review_id', 'user_id'), # голос пользователя и подсчет голосов отзыва
+    )
+
 
     ''' Пример отображения объекта '''
     def __repr__(self):
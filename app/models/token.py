@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, String, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+from app.utils.uuid7 import uuid7
+
+
+''' Отозванные токены: конкретный токен (jti) или все токены пользователя, выданные до revoked_at.
+    Запись нужна только до expires_at - позже отозванные токены истекают сами '''
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    jti = Column(String(36), nullable=True) # Идентификатор отозванного токена
+    user_id = Column(UUID(as_uuid=True), nullable=True) # Пользователь, все токены которого отозваны
+    revoked_at = Column(DateTime(timezone=True), nullable=False) # Время отзыва
+    expires_at = Column(DateTime(timezone=True), nullable=False) # Когда запись можно удалить
+
+    __table_args__ = (
+        Index('ix_token_revocations_expires_at', 'expires_at'),
+    )
+
+
+    ''' Пример отображения объекта '''
+    def __repr__(self):
+        return f"<TokenRevocation(jti='{self.jti}', user_id='{self.user_id}')>"
@@ -16,12 +16,13 @@ class User(BaseModel):
     is_admin = Column(Boolean, default=False, nullable=False) # Статус Admin
     is_active = Column(Boolean, default=True, nullable=False) # Статус Пользователь
 
-    ''' Создаем связь между таблицами Order, Cart, Review, ViewHistory, Favorite '''
+    ''' Создаем связь между таблицами Order, Cart, Review, ReviewHelpful, ViewHistory, Favorites '''
     orders = relationship("Order", back_populates="user")
     cart_items = relationship("Cart", back_populates="user")
     reviews = relationship("Review", back_populates="user")
     view_history = relationship("ViewHistory", back_populates="user")
-    favorites = relationship("Favorite", back_populates="user")
+    favorites = relationship("Favorites", back_populates="user")
+    helpful_reviews = relationship("ReviewHelpful", back_populates="user")
 
 
     ''' Пример отображения объекта '''
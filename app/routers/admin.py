@@ -1,22 +1,22 @@
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.admin_services import AdminService
+from app.services.admin_services import AsyncAdminService
 from app.services.auth_service import get_current_admin_user
 from app.models import User, Review
 from app.schemas.user import UserResponse
 from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
 from app.utils.exceptions import AdminServiceException
 from app.schemas.order import OrderResponse
-from app.database import get_db  # Импорт зависимости для получения Session
+from app.database import get_async_db  # Импорт зависимости для получения AsyncSession
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-def get_admin_service(db: Session = Depends(get_db)) -> AdminService:
-    """Фабричная функция для создания AdminService"""
-    return AdminService(db)
+def get_admin_service(db: AsyncSession = Depends(get_async_db)) -> AsyncAdminService:
+    """Фабричная функция для создания AdminService поверх асинхронной сессии"""
+    return AsyncAdminService(db)
 
 
 # === API ENDPOINTS ===
@@ -25,11 +25,11 @@ def get_admin_service(db: Session = Depends(get_db)) -> AdminService:
 
 @router.get("/api/stats")
 async def get_dashboard_stats(
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> dict[str, Any]:
     """API: Получить общую статистику"""
     try:
-        return admin_service.get_dashboard_stats()
+        return await admin_service.run(lambda service: service.get_dashboard_stats())
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -38,11 +38,11 @@ async def get_dashboard_stats(
 @router.get("/api/analytics")
 async def get_sales_analytics(
         days: int = Query(30, ge=1, le=365),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> Dict[str, Any]:
     """API: Получить аналитику продаж"""
     try:
-        return admin_service.get_sales_analytics(days=days)
+        return await admin_service.run(lambda service: service.get_sales_analytics(days=days))
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -54,11 +54,11 @@ async def get_users(
         skip: int = Query(0, ge=0),
         limit: int = Query(50, ge=1, le=100),
         search: Optional[str] = Query(None),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> List[UserResponse]:
     """API: Получить список пользователей"""
     try:
-        users = admin_service.get_all_users(skip=skip, limit=limit, search=search)
+        users = await admin_service.run(lambda service: service.get_all_users(skip=skip, limit=limit, search=search))
         return [UserResponse.model_validate(user) for user in users]
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -68,14 +68,14 @@ async def get_users(
 async def toggle_user_status(
         user_id: str,
         current_user: User = Depends(get_current_admin_user),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> UserResponse:
     """API: Активировать/деактивировать пользователя"""
     try:
         if user_id == str(current_user.id):
             raise HTTPException(status_code=400, detail="Нельзя изменить свой статус")
 
-        user = admin_service.toggle_user_status(user_id)
+        user = await admin_service.run(lambda service: service.toggle_user_status(user_id))
         return UserResponse.model_validate(user)
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -84,11 +84,11 @@ async def toggle_user_status(
 @router.post("/api/users/{user_id}/make-admin")
 async def make_user_admin(
         user_id: str,
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> UserResponse:
     """API: Назначить пользователя администратором"""
     try:
-        user = admin_service.make_admin(user_id)
+        user = await admin_service.run(lambda service: service.make_admin(user_id))
         return UserResponse.model_validate(user)
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -99,11 +99,11 @@ async def make_user_admin(
 @router.post("/api/products")
 async def create_product(
         product: ProductCreate,
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> ProductResponse:
     """API: Создать новый товар"""
     try:
-        created_product = admin_service.create_product(product)
+        created_product = await admin_service.run(lambda service: service.create_product(product))
         return ProductResponse.model_validate(created_product)
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -113,11 +113,11 @@ async def create_product(
 async def update_product(
         product_id: str,
         product: ProductUpdate,
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> ProductResponse:
     """API: Обновить товар"""
     try:
-        updated_product = admin_service.update_product(product_id, product)
+        updated_product = await admin_service.run(lambda service: service.update_product(product_id, product))
         return ProductResponse.model_validate(updated_product)
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -126,11 +126,11 @@ async def update_product(
 @router.delete("/api/products/{product_id}")
 async def delete_product(
         product_id: str,
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> Dict[str, str]:
     """API: Удалить товар"""
     try:
-        admin_service.delete_product(product_id)
+        await admin_service.run(lambda service: service.delete_product(product_id))
         return {"message": "Товар успешно удален"}
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -140,11 +140,11 @@ async def delete_product(
 async def update_product_stock(
         product_id: str,
         stock: int = Form(..., ge=0),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> ProductResponse:
     """API: Обновить остатки товара"""
     try:
-        updated_product = admin_service.update_product_stock(product_id, stock)
+        updated_product = await admin_service.run(lambda service: service.update_product_stock(product_id, stock))
         return ProductResponse.model_validate(updated_product)
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -156,7 +156,7 @@ async def update_product_stock(
 async def update_order_status(
         order_id: str,
         status: str = Form(...),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> Dict[str, Any]:
     """API: Обновить статус заказа"""
     try:
@@ -167,7 +167,7 @@ async def update_order_status(
                 detail=f"Недопустимый статус. Доступные значения: {', '.join(allowed_statuses)}"
             )
 
-        updated_order = admin_service.update_order_status(order_id, status)
+        updated_order = await admin_service.run(lambda service: service.update_order_status(order_id, status))
         return {"message": "Статус заказа успешно обновлен", "order": updated_order}
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -181,11 +181,11 @@ async def update_order_status(
 async def get_reviews(
         skip: int = Query(0, ge=0),
         limit: int = Query(50, ge=1, le=100),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> list[type[Review]]:
     """API: Получить список отзывов"""
     try:
-        return admin_service.get_all_reviews(skip=skip, limit=limit)
+        return await admin_service.run(lambda service: service.get_all_reviews(skip=skip, limit=limit))
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -193,11 +193,11 @@ async def get_reviews(
 @router.delete("/api/reviews/{review_id}")
 async def delete_review(
         review_id: str,
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
 ) -> Dict[str, str]:
     """API: Удалить отзыв"""
     try:
-        admin_service.delete_review(review_id)
+        await admin_service.run(lambda service: service.delete_review(review_id))
         return {"message": "Отзыв успешно удален"}
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -208,10 +208,15 @@ async def get_orders(
         skip: int = Query(0, ge=0),
         limit: int = Query(50, ge=1, le=100),
         status: Optional[str] = Query(None),
-        admin_service: AdminService = Depends(get_admin_service)
+        admin_service: AsyncAdminService = Depends(get_admin_service)
     ):
     """API: Получить список заказов"""
     try:
-        return admin_service.get_all_orders(skip=skip, limit=limit, status=status)
+        return await admin_service.run(
+            lambda service: [
+                OrderResponse.model_validate(order)
+                for order in service.get_all_orders(skip=skip, limit=limit, status=status)
+            ]
+        )
     except AdminServiceException as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -4,9 +4,12 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.database import get_db
 from app.services.auth_service import AuthService
-from app.schemas import UserCreate, UserResponse, UserLogin, Token, UserProfile, UserUpdate
-from app.utils.dependencies import get_current_active_user, get_current_user
+from app.schemas import UserCreate, UserResponse, UserLogin, Token, TokenData, UserProfile, UserUpdate
+from app.services.password_hasher import password_hasher
+from app.services.token_revocation import RevocationList
+from app.utils.dependencies import get_current_active_user, get_current_user, get_token_principal
 from app.utils.exceptions import AuthException
+from app.utils.login_throttle import login_throttle, throttle_login_ip
 from app.config import settings
 from app.models import User
 
@@ -30,25 +33,31 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         email=User.email,
         username=user.username,
         password=user.password,
-        full_name=user.full_name
+        full_name=user.full_name,
+        password_hash=await password_hasher.hash(user.password)
     )
     return db_user
 
 
 ''' Авторизация пользователя '''
 @router.post('/login', response_model=Token)
-async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = AuthService.authenticate_user(db, user_credentials.email, user_credentials.password)
+async def login_user(
+        user_credentials: UserLogin,
+        client_ip: str = Depends(throttle_login_ip),
+        db: Session = Depends(get_db)
+):
+    login_throttle.acquire_account(user_credentials.email)
+    user = await AuthService.authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
+        login_throttle.record_failure()
         raise AuthException.INVALID_CREDENTIALS
+    login_throttle.record_success(client_ip, user_credentials.email)
 
     if not user.is_active:
         raise AuthException.INACTIVE_USER
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = AuthService.create_access_token(
-        data={'sub': user.email}, expires_delta=access_token_expires
-    )
+    access_token = AuthService.create_user_token(user, expires_delta=access_token_expires)
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
@@ -57,21 +66,23 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
 @router.post('/token', response_model=Token)
 async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
+        client_ip: str = Depends(throttle_login_ip),
         db: Session = Depends(get_db)
 ):
 
     """ Авторизация через OAuth2 форму """
-    user = AuthService.authenticate_user(db, form_data.username, form_data.password)
+    login_throttle.acquire_account(form_data.username)
+    user = await AuthService.authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        login_throttle.record_failure()
         raise AuthException.INVALID_CREDENTIALS
+    login_throttle.record_success(client_ip, form_data.username)
 
     if not user.is_active:
         raise AuthException.INACTIVE_USER
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = AuthService.create_access_token(
-        data={'sub': user.email}, expires_delta=access_token_expires
-    )
+    access_token = AuthService.create_user_token(user, expires_delta=access_token_expires)
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
@@ -97,7 +108,6 @@ async def update_current_user_profile(
     if user_update.address is not None:
         current_user.address = user_update.address
     db.commit()
-    db.refresh(current_user)
     return current_user
 
 
@@ -109,4 +119,11 @@ async def verify_token(current_user: User = Depends(get_current_user)):
         'user_id': str(current_user.id),
         'email': current_user.email,
         'is_admin': current_user.is_admin
-    }
\ No newline at end of file
+    }
+
+
+''' Выход: отзыв текущего токена (до его истечения) '''
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+def logout(principal: TokenData = Depends(get_token_principal), db: Session = Depends(get_db)):
+    RevocationList.revoke_token(db, principal)
+    db.commit()
@@ -1,36 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 import math
 
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.history import (
     ViewHistoryResponse, ViewHistoryList,
     FavoritesResponse, FavoritesList, FavoritesCreate,
     FavoritesToggleResponse
 )
 from app.services.history_service import HistoryService, FavoritesService
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, get_token_principal
 from app.models.user import User
+from app.schemas.user import TokenData
 
 router = APIRouter(prefix="/history", tags=["history"])
 favorites_router = APIRouter(prefix="/favorites", tags=["favorites"])
 
 
+def _history_page(db: Session, user_id: uuid.UUID, page: int, size: int) -> ViewHistoryList:
+    """
+    Страница истории просмотров (сериализуется внутри run_sync, пока доступна ленивая загрузка товара).
+    """
+    items, total = HistoryService.get_user_history(db=db, user_id=user_id, page=page, size=size)
+
+    return ViewHistoryList(
+        items=[ViewHistoryResponse.model_validate(item) for item in items],
+        total=total,
+        page=page,
+        size=size,
+        pages=math.ceil(total / size)
+    )
+
+
+def _favorites_page(db: Session, user_id: uuid.UUID, page: int, size: int) -> FavoritesList:
+    """
+    Страница избранного (сериализуется внутри run_sync, пока доступна ленивая загрузка товара).
+    """
+    items, total = FavoritesService.get_user_favorites(db=db, user_id=user_id, page=page, size=size)
+
+    return FavoritesList(
+        items=[FavoritesResponse.model_validate(item) for item in items],
+        total=total,
+        page=page,
+        size=size,
+        pages=math.ceil(total / size)
+    )
+
+
 # История просмотров
 @router.post("/view/{product_id}", status_code=status.HTTP_201_CREATED)
 async def add_view_history(
         product_id: uuid.UUID,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Добавляет товар в историю просмотров пользователя.
     """
     try:
-        view_record = HistoryService.add_view_history(
-            db=db,
+        view_record = await db.run_sync(
+            HistoryService.add_view_history,
             user_id=current_user.id,
             product_id=product_id
         )
@@ -46,29 +78,14 @@ async def add_view_history(
 async def get_user_history(
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(20, ge=1, le=100, description="Размер страницы"),
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        principal: TokenData = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получает историю просмотров текущего пользователя.
     """
     try:
-        items, total = HistoryService.get_user_history(
-            db=db,
-            user_id=current_user.id,
-            page=page,
-            size=size
-        )
-
-        pages = math.ceil(total / size)
-
-        return ViewHistoryList(
-            items=[ViewHistoryResponse.from_orm(item) for item in items],
-            total=total,
-            page=page,
-            size=size,
-            pages=pages
-        )
+        return await db.run_sync(_history_page, principal.user_id, page, size)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -80,14 +97,14 @@ async def get_user_history(
 async def get_popular_products(
         days: int = Query(7, ge=1, le=365, description="Количество дней для анализа"),
         limit: int = Query(10, ge=1, le=50, description="Количество товаров"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получает популярные товары на основе истории просмотров.
     """
     try:
-        popular_products = HistoryService.get_popular_products(
-            db=db,
+        popular_products = await db.run_sync(
+            HistoryService.get_popular_products,
             days=days,
             limit=limit
         )
@@ -104,14 +121,14 @@ async def get_popular_products(
 async def toggle_favorite(
         product_id: uuid.UUID,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Переключает товар в избранном (добавляет/удаляет).
     """
     try:
-        result = FavoritesService.toggle_favorite(
-            db=db,
+        result = await db.run_sync(
+            FavoritesService.toggle_favorite,
             user_id=current_user.id,
             product_id=product_id
         )
@@ -127,14 +144,14 @@ async def toggle_favorite(
 async def add_to_favorites(
         product_id: uuid.UUID,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Добавляет товар в избранное.
     """
     try:
-        favorite = FavoritesService.add_to_favorites(
-            db=db,
+        favorite = await db.run_sync(
+            FavoritesService.add_to_favorites,
             user_id=current_user.id,
             product_id=product_id
         )
@@ -150,14 +167,14 @@ async def add_to_favorites(
 async def remove_from_favorites(
         product_id: uuid.UUID,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удаляет товар из избранного.
     """
     try:
-        removed = FavoritesService.remove_from_favorites(
-            db=db,
+        removed = await db.run_sync(
+            FavoritesService.remove_from_favorites,
             user_id=current_user.id,
             product_id=product_id
         )
@@ -177,29 +194,14 @@ async def remove_from_favorites(
 async def get_user_favorites(
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(20, ge=1, le=100, description="Размер страницы"),
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        principal: TokenData = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получает избранные товары текущего пользователя.
     """
     try:
-        items, total = FavoritesService.get_user_favorites(
-            db=db,
-            user_id=current_user.id,
-            page=page,
-            size=size
-        )
-
-        pages = math.ceil(total / size)
-
-        return FavoritesList(
-            items=[FavoritesResponse.from_orm(item) for item in items],
-            total=total,
-            page=page,
-            size=size,
-            pages=pages
-        )
+        return await db.run_sync(_favorites_page, principal.user_id, page, size)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -210,16 +212,16 @@ async def get_user_favorites(
 @favorites_router.get("/check/{product_id}")
 async def check_favorite_status(
         product_id: uuid.UUID,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        principal: TokenData = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Проверяет, находится ли товар в избранном у пользователя.
     """
     try:
-        is_favorite = FavoritesService.is_favorite(
-            db=db,
-            user_id=current_user.id,
+        is_favorite = await db.run_sync(
+            FavoritesService.is_favorite,
+            user_id=principal.user_id,
             product_id=product_id
         )
         return {"is_favorite": is_favorite}
@@ -232,16 +234,16 @@ async def check_favorite_status(
 
 @favorites_router.get("/count")
 async def get_favorites_count(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        principal: TokenData = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получает количество избранных товаров у пользователя.
     """
     try:
-        count = FavoritesService.get_favorites_count(
-            db=db,
-            user_id=current_user.id
+        count = await db.run_sync(
+            FavoritesService.get_favorites_count,
+            user_id=principal.user_id
         )
         return {"count": count}
     except Exception as e:
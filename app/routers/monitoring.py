@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.schemas.user import TokenData
+from app.services.principal_cache import principal_cache
+from app.utils.dependencies import get_admin_principal
+from app.utils.loop_monitor import loop_monitor
+
+router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики Prometheus"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/debug/loop-lag")
+async def loop_lag(
+        limit: int = Query(20, ge=1, le=100),
+        current_admin: TokenData = Depends(get_admin_principal)
+):
+    """Задержка event loop и последние блокировки с маршрутом и стеком"""
+    return loop_monitor.snapshot(limit)
+
+
+@router.get("/debug/principal-cache")
+async def principal_cache_stats(current_admin: TokenData = Depends(get_admin_principal)):
+    """Кеш авторизованных пользователей: размер, попадания и промахи с запуска процесса"""
+    return principal_cache.stats()
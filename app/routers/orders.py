@@ -14,8 +14,11 @@ from app.database import get_db
 from app.models.user import User
 from app.models.product import Product
 from app.models.order import Cart
-from ..utils.dependencies import get_current_user, get_current_admin_user
+from app.schemas.user import TokenData
+from ..utils.dependencies import get_current_user, get_current_admin_user, get_token_principal
 from ..services.file_service import file_service
+from ..services.order_service import OrderService
+from ..services.product_service import ProductService
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -24,13 +27,13 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 
 @router.get("/cart", response_model=CartResponse)
 async def get_cart(
-        current_user: User = Depends(get_current_user),
+        principal: TokenData = Depends(get_token_principal),
         db: Session = Depends(get_db)
 ):
     """Получение корзины пользователя"""
 
     # Получаем элементы корзины с информацией о товарах
-    cart_items = db.query(Cart, Product).join(Product, Cart.product_id == Product.id).filter(Cart.user_id == current_user.id).all()
+    cart_items = OrderService.get_cart_items(db, principal.user_id)
 
     items_response = []
     total_amount = Decimal('0')
@@ -69,7 +72,7 @@ async def add_to_cart(
     """Добавление товара в корзину"""
 
     # Проверяем существование товара
-    product = db.query(Product).filter(Product.id == item.product_id).first()
+    product = ProductService.get_product_by_id(db, item.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Товар не найден")
 
@@ -81,9 +84,7 @@ async def add_to_cart(
         )
 
     # Проверяем, есть ли уже этот товар в корзине
-    existing_item = db.query(Cart).filter(
-        and_(Cart.user_id == current_user.id, Cart.product_id == item.product_id)
-    ).first()
+    existing_item = OrderService.find_cart_item(db, current_user.id, item.product_id)
 
     if existing_item:
         # Обновляем количество
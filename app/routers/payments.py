@@ -2,7 +2,7 @@ from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 
 from ..database import get_db
 from app.models import User, Order
@@ -80,7 +80,6 @@ async def click_complete(
         order.status = 'confirmed'
         order.payment_id = body.get('click_trans_id')
         order.payment_method = 'click'
-        order.updated_at = datetime.now(timezone.utc)
 
         db.commit()
 
@@ -181,7 +180,6 @@ async def payme_create_transaction(
         ''' Обновляем заказ '''
         order.payment_id = transaction_id
         order.payment_method = 'payme'
-        order.updated_at = datetime.now(timezone.utc)
 
         db.commit()
 
@@ -230,7 +228,6 @@ async def payme_perform_transaction(
 
         ''' Подтверждаем заказ '''
         order.status = 'confirmed'
-        order.updated_at = datetime.now(timezone.utc)
 
         db.commit()
 
@@ -1,157 +1,263 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy import and_, select
+from typing import List, Optional, Tuple
 import uuid
 
-from ..database import get_db
+from ..config import settings
+from ..database import get_async_db
 from ..models.product import Product, GradeEnum
-from ..schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from ..schemas.product import ProductCreate, ProductUpdate, ProductResponse, CatalogFilter, ProductBatchRequest
+from ..services.catalog_cache import catalog_cache
+from ..services.catalog_snapshot import catalog_snapshot
 from ..services.file_service import file_service
+from ..services.product_serializer import ProductSerializer
+from ..services.product_service import ProductService, SORT_FIELDS
 from ..utils.dependencies import get_current_admin_user
+from ..utils.http_cache import make_etag, conditional_response
 from ..models.user import User
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
-@router.get("/", response_model=dict)
-async def get_products(
-        page: int = Query(1, ge=1, description="Номер страницы"),
-        limit: int = Query(10, ge=1, le=50, description="Количество товаров на странице"),
+def get_catalog_filter(
         search: Optional[str] = Query(None, description="Поиск по названию"),
         grade: Optional[GradeEnum] = Query(None, description="Фильтр по грейду"),
         manufacturer: Optional[str] = Query(None, description="Фильтр по производителю"),
         series: Optional[str] = Query(None, description="Фильтр по серии"),
         min_price: Optional[float] = Query(None, ge=0, description="Минимальная цена"),
         max_price: Optional[float] = Query(None, ge=0, description="Максимальная цена"),
-        in_stock_only: bool = Query(False, description="Только товары в наличии"),
-        sort_by: str = Query("created_at", description="Сортировка: name, price, rating, created_at"),
+        in_stock_only: bool = Query(False, description="Только товары в наличии")
+) -> CatalogFilter:
+    """Фильтры каталога из query-параметров"""
+    return CatalogFilter(
+        search=search,
+        grade=grade,
+        manufacturer=manufacturer,
+        series=series,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock_only=in_stock_only
+    )
+
+
+@router.get("/", response_model=dict)
+async def get_products(
+        request: Request,
+        response: Response,
+        page: int = Query(1, ge=1, description="Номер страницы"),
+        limit: int = Query(10, ge=1, le=50, description="Количество товаров на странице"),
+        sort_by: str = Query("created_at", description="Сортировка: name, price, rating, created_at, relevance"),
         sort_order: str = Query("desc", description="Порядок: asc, desc"),
-        db: Session = Depends(get_db)
+        pagination: str = Query("offset", pattern="^(offset|cursor)$", description="Режим пагинации: offset, cursor"),
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы (из next_cursor)"),
+        total: str = Query("exact", pattern="^(exact|estimate|none)$", description="Подсчет количества: exact, estimate, none"),
+        fields: Optional[str] = Query(None, description="Поля товара через запятую, например: id,name,price,thumbnail_url"),
+        filters: CatalogFilter = Depends(get_catalog_filter),
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получение списка товаров с фильтрацией и пагинацией"""
 
-    # Базовый запрос
-    query = db.query(Product)
+    if sort_by not in ("name", "price", "rating", "created_at", "relevance"):
+        sort_by = "created_at"
+    if sort_order != "asc":
+        sort_order = "desc"
 
-    # Применяем фильтры
-    filters = []
+    try:
+        item_fields = ProductSerializer.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # ETag списка: версия каталога + параметры запроса
+    etag = make_etag("products", await db.run_sync(catalog_cache.version), sorted(request.query_params.multi_items()))
+    not_modified = conditional_response(request, response, etag, settings.PRODUCT_LIST_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+
+    page_data = await db.run_sync(
+        _catalog_page, filters, sort_by, sort_order, page, limit, pagination, cursor, total, item_fields
+    )
+
+    # Формируем ответ сразу в JSON
+    return ProductSerializer.json_response(page_data, headers=response.headers)
+
+
+def _catalog_page(
+        db: Session,
+        filters: CatalogFilter,
+        sort_by: str,
+        sort_order: str,
+        page: int,
+        limit: int,
+        pagination: str,
+        cursor: Optional[str],
+        total: str,
+        item_fields: Optional[Tuple[str, ...]]
+) -> dict:
+    """Страница каталога: снимок в памяти или запрос к БД (выполняется через AsyncSession.run_sync)"""
+
+    filters_data = {**filters.model_dump(), "sort_by": sort_by, "sort_order": sort_order}
+    offset_mode = pagination == "offset" and not cursor
+
+    # Обычный листинг без поиска отдаем из снимка каталога в памяти
+    snapshot = catalog_snapshot.get(db) if offset_mode and not filters.search else None
+    if snapshot is not None:
+        items, total_count = snapshot.query(filters, sort_by, sort_order, (page - 1) * limit, limit)
+        return {
+            "products": [ProductSerializer.project(item, item_fields) for item in items],
+            "pagination": {
+                "mode": "offset",
+                "page": page,
+                "limit": limit,
+                "total_count": total_count,
+                "total_pages": (total_count + limit - 1) // limit,
+                "total_is_estimate": False,
+                "has_next": page * limit < total_count,
+                "has_prev": page > 1
+            },
+            "filters": filters_data
+        }
 
-    if search:
-        filters.append(
-            or_(
-                Product.name.ilike(f"%{search}%"),
-                Product.description.ilike(f"%{search}%"),
-                Product.series.ilike(f"%{search}%")
-            )
-        )
+    # Базовый запрос с фильтрами (только нужные колонки, без ORM-объектов)
+    sort_attr = SORT_FIELDS.get(sort_by, SORT_FIELDS["created_at"])[1]
+    query = db.query(*ProductSerializer.columns_for(item_fields, sort_attr))
+    conditions = ProductService.catalog_conditions(filters, db.get_bind().dialect.name)
+    if conditions:
+        query = query.filter(and_(*conditions))
+
+    # Подсчет общего количества (exact / estimate / none)
+    total_count = ProductService.count_products(db, query, total)
+
+    if not offset_mode:
+        # Keyset-пагинация по паре (колонка сортировки, id)
+        try:
+            products, next_cursor = ProductService.paginate_by_cursor(query, sort_by, sort_order, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        pagination_data = {
+            "mode": "cursor",
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+            "total_count": total_count,
+            "total_is_estimate": total == "estimate"
+        }
+    else:
+        # Сортировка и пагинация через OFFSET
+        query = ProductService.apply_sorting(query, sort_by, sort_order, filters.search)
+        offset = (page - 1) * limit
+        products = query.offset(offset).limit(limit + 1).all()
+        has_next = len(products) > limit
+        products = products[:limit]
+
+        pagination_data = {
+            "mode": "offset",
+            "page": page,
+            "limit": limit,
+            "total_count": total_count,
+            "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+            "total_is_estimate": total == "estimate",
+            "has_next": has_next,
+            "has_prev": page > 1
+        }
 
-    if grade:
-        filters.append(Product.grade == grade)
+    # Формируем ответ
+    return {
+        "products": ProductSerializer.to_items(products, item_fields),
+        "pagination": pagination_data,
+        "filters": filters_data
+    }
 
-    if manufacturer:
-        filters.append(Product.manufacturer.ilike(f"%{manufacturer}%"))
 
-    if series:
-        filters.append(Product.series.ilike(f"%{series}%"))
+@router.get("/featured", response_model=dict)
+async def get_featured_products(
+        limit: int = Query(8, ge=1, le=settings.PRODUCT_TOP_LIST_SIZE, description="Количество товаров"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Рекомендуемые товары (по рейтингу и количеству отзывов)"""
+    products = await db.run_sync(ProductService.get_featured_products, limit)
+    return ProductSerializer.json_response({"products": products})
+
 
-    if min_price is not None:
-        filters.append(Product.price >= min_price)
+@router.get("/latest", response_model=dict)
+async def get_latest_products(
+        limit: int = Query(8, ge=1, le=settings.PRODUCT_TOP_LIST_SIZE, description="Количество товаров"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Новые поступления"""
+    products = await db.run_sync(ProductService.get_latest_products, limit)
+    return ProductSerializer.json_response({"products": products})
+
+
+async def _batch_products(ids: List[uuid.UUID], db: AsyncSession) -> dict:
+    """Товары по списку ID в порядке запроса (повторы убираются)"""
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.PRODUCT_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Можно запросить не более {settings.PRODUCT_BATCH_MAX_IDS} товаров за раз"
+        )
 
-    if max_price is not None:
-        filters.append(Product.price <= max_price)
+    products = await db.run_sync(ProductService.get_products_by_ids, ids)
+    found = {product.id for product in products}
 
-    if in_stock_only:
-        filters.append(Product.in_stock > 0)
+    return {
+        "products": [ProductService.to_detail_item(product) for product in products],
+        "missing": [str(product_id) for product_id in ids if product_id not in found]
+    }
 
-    # Применяем все фильтры
-    if filters:
-        query = query.filter(and_(*filters))
 
-    # Сортировка
-    if sort_by == "name":
-        order_column = Product.name
-    elif sort_by == "price":
-        order_column = Product.price
-    elif sort_by == "rating":
-        order_column = Product.average_rating
-    else:
-        order_column = Product.created_at
+@router.get("/batch", response_model=dict)
+async def get_products_batch(
+        ids: List[str] = Query(..., description="ID товаров через запятую или повторяющимся параметром"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Получение нескольких товаров по ID одним запросом"""
+    try:
+        product_ids = [uuid.UUID(value.strip()) for item in ids for value in item.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный формат ID товара")
 
-    if sort_order == "asc":
-        query = query.order_by(order_column.asc())
-    else:
-        query = query.order_by(order_column.desc())
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="Не переданы ID товаров")
 
-    # Подсчет общего количества
-    total_count = query.count()
+    return await _batch_products(product_ids, db)
 
-    # Пагинация
-    offset = (page - 1) * limit
-    products = query.offset(offset).limit(limit).all()
 
-    # Формируем ответ
-    return {
-        "products": [
-            {
-                **ProductResponse.from_orm(product).dict(),
-                "main_image_url": file_service.get_image_url(product.main_image),
-                "thumbnail_url": file_service.get_image_url(product.main_image, "thumbnail")
-            }
-            for product in products
-        ],
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total_count": total_count,
-            "total_pages": (total_count + limit - 1) // limit,
-            "has_next": page * limit < total_count,
-            "has_prev": page > 1
-        },
-        "filters": {
-            "search": search,
-            "grade": grade,
-            "manufacturer": manufacturer,
-            "series": series,
-            "min_price": min_price,
-            "max_price": max_price,
-            "in_stock_only": in_stock_only,
-            "sort_by": sort_by,
-            "sort_order": sort_order
-        }
-    }
+@router.post("/batch", response_model=dict)
+async def get_products_batch_post(batch: ProductBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Получение нескольких товаров по ID (для длинных списков)"""
+    return await _batch_products(batch.ids, db)
 
 
 @router.get("/{product_id}", response_model=dict)
-async def get_product(product_id: str, db: Session = Depends(get_db)):
+async def get_product(product_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """Получение товара по ID"""
     try:
         product_uuid = uuid.UUID(product_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Неверный формат ID товара")
 
-    product = db.query(Product).filter(product_uuid == Product.id).first()
+    # Условный запрос: сверяем ETag по одному updated_at, не загружая товар целиком
+    if request.headers.get("if-none-match"):
+        updated_at = await db.scalar(select(Product.updated_at).where(product_uuid == Product.id))
+        if updated_at is not None:
+            etag = make_etag("product", product_uuid, updated_at.isoformat())
+            not_modified = conditional_response(request, response, etag, settings.PRODUCT_CACHE_CONTROL)
+            if not_modified:
+                return not_modified
+
+    product = await db.get(Product, product_uuid)
     if not product:
         raise HTTPException(status_code=404, detail="Товар не найден")
 
-    # Формируем URLs для изображений
-    additional_images = []
-    if product.additional_images:
-        for img in product.additional_images:
-            additional_images.append({
-                "thumbnail": file_service.get_image_url(img, "thumbnail"),
-                "medium": file_service.get_image_url(img, "medium"),
-                "large": file_service.get_image_url(img, "large")
-            })
+    etag = make_etag("product", product.id, product.updated_at.isoformat())
+    conditional_response(request, response, etag, settings.PRODUCT_CACHE_CONTROL)
 
-    product_data = ProductResponse.from_orm(product).dict()
-    product_data.update({
-        "main_image_url": file_service.get_image_url(product.main_image, "large"),
-        "main_image_thumbnail": file_service.get_image_url(product.main_image, "thumbnail"),
-        "additional_images_urls": additional_images
-    })
-
-    return product_data
+    # Данные товара и URLs для изображений
+    return ProductService.to_detail_item(product)
 
 
 @router.post("/", response_model=ProductResponse)
@@ -168,7 +274,7 @@ async def create_product(
         main_image: UploadFile = File(...),
         additional_images: List[UploadFile] = File(default=[]),
         current_admin: User = Depends(get_current_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Создание нового товара (только для админов)"""
 
@@ -196,8 +302,8 @@ async def create_product(
 
     product = Product(**product_data)
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.run_sync(catalog_cache.bump)
+    await db.commit()
 
     return product
 
@@ -217,7 +323,7 @@ async def update_product(
         main_image: Optional[UploadFile] = File(None),
         additional_images: List[UploadFile] = File(default=[]),
         current_admin: User = Depends(get_current_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Обновление товара (только для админов)"""
 
@@ -226,7 +332,7 @@ async def update_product(
     except ValueError:
         raise HTTPException(status_code=400, detail="Неверный формат ID товара")
 
-    product = db.query(Product).filter(product_uuid == Product.id).first()
+    product = await db.get(Product, product_uuid)
     if not product:
         raise HTTPException(status_code=404, detail="Товар не найден")
 
@@ -273,8 +379,8 @@ async def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    await db.run_sync(catalog_cache.bump)
+    await db.commit()
 
     return product
 
@@ -283,7 +389,7 @@ async def update_product(
 async def delete_product(
         product_id: str,
         current_admin: User = Depends(get_current_admin_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Удаление товара (только для админов)"""
 
@@ -292,7 +398,7 @@ async def delete_product(
     except ValueError:
         raise HTTPException(status_code=400, detail="Неверный формат ID товара")
 
-    product = db.query(Product).filter(product_uuid == Product.id).first()
+    product = await db.get(Product, product_uuid)
     if not product:
         raise HTTPException(status_code=404, detail="Товар не найден")
 
@@ -301,33 +407,45 @@ async def delete_product(
     file_service.delete_product_images([img for img in images_to_delete if img])
 
     # Удаляем товар
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.run_sync(catalog_cache.bump)
+    await db.commit()
 
     return {"message": "Товар успешно удален"}
 
 
 @router.get("/filters/options")
-async def get_filter_options(db: Session = Depends(get_db)):
-    """Получение опций для фильтров"""
-
-    # Получаем уникальные значения для фильтров
-    manufacturers = db.query(Product.manufacturer).distinct().all()
-    series = db.query(Product.series).distinct().all()
-    grades = [grade.value for grade in Grade]
+async def get_filter_options(db: AsyncSession = Depends(get_async_db)):
+    """Получение опций для фильтров (кешируется до следующего изменения каталога)"""
 
-    # Получаем диапазон цен
-    price_range = db.query(
-        db.func.min(Product.price).label('min_price'),
-        db.func.max(Product.price).label('max_price')
-    ).first()
+    filters_data = await db.run_sync(ProductService.get_product_filters_data)
 
     return {
-        "manufacturers": [m[0] for m in manufacturers if m[0]],
-        "series": [s[0] for s in series if s[0]],
-        "grades": grades,
+        "manufacturers": filters_data["manufacturers"],
+        "series": filters_data["series"],
+        "grades": filters_data["grades"],
         "price_range": {
-            "min": float(price_range.min_price) if price_range.min_price else 0,
-            "max": float(price_range.max_price) if price_range.max_price else 0
+            "min": filters_data["price_min"],
+            "max": filters_data["price_max"]
         }
-    }
\ No newline at end of file
+    }
+
+
+def _catalog_facets(db: Session, filters: CatalogFilter) -> dict:
+    """Без поиска считаем по снимку каталога в памяти, иначе - одним групповым запросом"""
+    snapshot = catalog_snapshot.get(db) if not filters.search else None
+    if snapshot is not None:
+        return snapshot.facets(filters)
+    return ProductService.get_facets(db, filters)
+
+
+@router.get("/filters/facets")
+async def get_filter_facets(
+        filters: CatalogFilter = Depends(get_catalog_filter),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Количество товаров по grade, производителям и сериям и диапазон цен для текущего фильтра"""
+
+    facets = await db.run_sync(_catalog_facets, filters)
+
+    return {**facets, "filters": filters.model_dump()}
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import uuid
 import math
 from datetime import datetime, timezone
 
-from ..database import get_db
+from ..database import get_async_db
 from app.services.review_service import ReviewService
 from ..utils.dependencies import get_current_user, get_current_admin_user
 from app.models import User
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/api/reviews", tags=["reviews"])
 @router.post("/", response_model=Review)
 async def create_review(
         review_data: Review,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Создание нового отзыва"""
@@ -31,7 +31,7 @@ async def get_reviews(
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(10, ge=1, le=50, description="Количество элементов на странице"),
         rating_filter: Optional[int] = Query(None, ge=1, le=5, description="Фильтр по рейтингу"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получение списка отзывов"""
 
@@ -59,7 +59,7 @@ async def get_reviews(
 async def get_my_reviews(
         page: int = Query(1, ge=1),
         size: int = Query(10, ge=1, le=50),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Получение отзывов текущего пользователя"""
@@ -87,7 +87,7 @@ async def get_my_reviews(
 @router.get("/{review_id}", response_model=Review)
 async def get_review(
         review_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: Optional[User] = Depends(get_current_user)
 ):
     """Получение отзыва по ID"""
@@ -100,7 +100,7 @@ async def get_review(
 async def update_review(
         review_id: uuid.UUID,
         review_data: ReviewUpdate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Обновление отзыва"""
@@ -117,7 +117,7 @@ async def update_review(
 @router.delete("/{review_id}")
 async def delete_review(
         review_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Удаление отзыва"""
@@ -136,7 +136,7 @@ async def delete_review(
 async def add_review_images(
         review_id: uuid.UUID,
         images: List[UploadFile] = File(..., description="Изображения для отзыва (макс. 5)"),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Добавление изображений к отзыву"""
@@ -159,7 +159,7 @@ async def add_review_images(
 async def vote_helpful(
         review_id: uuid.UUID,
         vote_data: ReviewHelpfulCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
     """Голосование за полезность отзыва"""
@@ -175,7 +175,7 @@ async def vote_helpful(
 @router.get("/stats/{product_id}", response_model=ReviewStats)
 async def get_review_stats(
         product_id: uuid.UUID,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Получение статистики отзывов для товара"""
 
@@ -187,7 +187,7 @@ async def get_review_stats(
 async def get_pending_reviews(
         page: int = Query(1, ge=1),
         size: int = Query(20, ge=1, le=100),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: User = Depends(get_current_admin_user)
 ):
     """Получение отзывов на модерацию (только для админов)"""
@@ -217,7 +217,7 @@ async def get_pending_reviews(
 @router.patch("/admin/{review_id}/approve", response_model=Review)
 async def approve_review(
         review_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: User = Depends(get_current_admin_user)
 ):
     """Одобрение отзыва (только для админов)"""
@@ -235,7 +235,7 @@ async def approve_review(
 @router.patch("/admin/{review_id}/hide", response_model=Review)
 async def hide_review(
         review_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: User = Depends(get_current_admin_user)
 ):
     """Скрытие отзыва (только для админов)"""
@@ -253,7 +253,7 @@ async def hide_review(
 @router.delete("/admin/{review_id}")
 async def admin_delete_review(
         review_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_admin: User = Depends(get_current_admin_user)
 ):
     """Удаление отзыва администратором"""
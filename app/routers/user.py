@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app.services.auth_service import get_current_user
 from app.database import get_db
-from app.models import User, Order, OrderItem, Review, Product, ViewHistory
+from app.models import User, Order, OrderItem, OrderStatusEnum, Review, Product, ViewHistory
+from app.services.order_service import OrderService
 
 router = APIRouter(prefix='/profile', tags=['profile'])
 
@@ -18,20 +19,11 @@ async def profile_dashboard(
         current_user: User = Depends(get_current_user)
 ):
     """ Получаем последние заказы """
-    recent_orders = db.query(Order).filter(
-        and_(
-            Order.user_id == current_user.id
-        )
-    ).order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = OrderService.get_user_orders(db, current_user.id, limit=5)
 
     ''' Получаем статистику '''
-    total_orders = db.query(Order).filter(and_(Order.user_id == current_user.id)).count()
-    pending_orders = db.query(Order).filter(
-        and_(
-            Order.user_id == current_user.id,
-            Order.status == 'pending'
-        )
-    ).count()
+    total_orders = OrderService.count_user_orders(db, current_user.id)
+    pending_orders = OrderService.count_user_orders(db, current_user.id, status=OrderStatusEnum.PENDING)
 
     ''' Получаем последние просмотренные товары '''
     recent_views = db.query(ViewHistory).filter(
@@ -68,18 +60,14 @@ async def user_orders(
     per_page = 10
     offset = (page - 1) * per_page
 
-    orders = db.query(Order).filter(
-        and_(
-            Order.user_id == current_user.id
-        )
-    ).order_by(Order.created_at.desc()).offset(offset).limit(per_page).all()
+    orders = OrderService.get_user_orders(db, current_user.id, skip=offset, limit=per_page)
 
-    total_orders = db.query(Order).filter(and_(Order.user_id == current_user.id)).count()
+    total_orders = OrderService.count_user_orders(db, current_user.id)
     total_pages = (total_orders + per_page - 1) // per_page
 
     ''' Получаем товары для каждого заказа '''
     for order in orders:
-        order.items = db.query(OrderItem).filter(and_(OrderItem.order_id == order.id)).all()
+        order.items = OrderService.get_order_items(db, order.id)
         for item in order.items:
             item.product = db.query(Product).filter(and_(Product.id == item.product_id)).first()
 
@@ -112,7 +100,7 @@ async def order_details(
         return RedirectResponse(url='/profile/orders', status_code=303)
 
     ''' Получаем товары заказа '''
-    order.items = db.query(OrderItem).filter(and_(OrderItem.order_id == order.id)).all()
+    order.items = OrderService.get_order_items(db, order.id)
     for item in order.items:
         item.product = db.query(Product).filter(and_(Product.id == item.product_id)).first()
 
@@ -220,7 +208,7 @@ async def update_profile(
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    from ..services.auth_service import verify_password, get_password_hash
+    from ..services.password_hasher import password_hasher
 
     ''' Обновляем основную информацию '''
     current_user.full_name = full_name
@@ -229,7 +217,8 @@ async def update_profile(
 
     ''' Если указан новый пароль '''
     if new_password and current_password:
-        if not verify_password(current_password, current_user.password_hash):
+        valid, _ = await password_hasher.verify_and_update(current_password, current_user.password_hash)
+        if not valid:
             return templates.TemplateResponse('profile/settings.html', {
                 'request': request,
                 'user': current_user,
@@ -237,7 +226,7 @@ async def update_profile(
                 'error': 'Неверный текущий пароль'
             })
 
-        current_user.password_hash = get_password_hash(new_password)
+        current_user.password_hash = await password_hasher.hash(new_password)
 
     db.commit()
 
@@ -1,6 +1,6 @@
 from app.schemas.history import ViewHistoryBase, ViewHistoryCreate, ViewHistoryResponse, ViewHistoryList, FavoritesBase, FavoritesCreate, FavoritesResponse, FavoritesList, FavoritesToggleResponse
 from app.schemas.order import CartItemCreate, CartItemUpdate, CartItemResponse, CartResponse, OrderListResponse, OrderCreate, OrderResponse, OrderUpdate, OrderStatsResponse
-from app.schemas.product import ProductBase, ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductFilter, ProductImageUpload
+from app.schemas.product import ProductBase, ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductFilter, CatalogFilter, ProductBatchRequest, ProductImageUpload
 from app.schemas.review import ReviewBase, ReviewCreate, ReviewUpdate, ReviewImageUpload, UserInReview, ProductInReview, Review, ReviewList, ReviewStats, ReviewHelpfulCreate, ReviewHelpful
 from app.schemas.user import UserBase, UserCreate, UserUpdate, UserResponse, UserLogin, UserProfile, Token, TokenData
 from app.schemas.payments import PaymentMethod, PaymentStatus, PaymentCreate, PaymentResponse, PaymentCallback, ClickPrepareRequest, ClickCompleteRequest, ClickResponse, PayMeRequest, PayMeResponse
@@ -11,7 +11,7 @@ from app.schemas.admin import AdminStatsResponse, SalesAnalyticsResponse, UserSt
 __all__ = [
     'ViewHistoryBase', 'ViewHistoryCreate', 'ViewHistoryResponse', 'ViewHistoryList', 'FavoritesBase', 'FavoritesCreate', 'FavoritesResponse', 'FavoritesList', 'FavoritesToggleResponse',
     'CartItemCreate', 'CartItemUpdate', 'CartItemResponse', 'CartResponse', 'OrderListResponse', 'OrderCreate', 'OrderResponse', 'OrderUpdate', 'OrderStatsResponse',
-    'ProductBase', 'ProductCreate', 'ProductUpdate', 'ProductResponse', 'ProductListResponse', 'ProductFilter', 'ProductImageUpload',
+    'ProductBase', 'ProductCreate', 'ProductUpdate', 'ProductResponse', 'ProductListResponse', 'ProductFilter', 'CatalogFilter', 'ProductBatchRequest', 'ProductImageUpload',
     'ReviewBase', 'ReviewCreate', 'ReviewUpdate', 'ReviewImageUpload', 'UserInReview', 'ProductInReview', 'Review', 'ReviewList', 'ReviewStats', 'ReviewHelpfulCreate', 'ReviewHelpful',
     'UserBase', 'UserCreate', 'UserUpdate', 'UserResponse', 'UserLogin', 'UserProfile', 'Token', 'TokenData',
     'PaymentMethod', 'PaymentStatus', 'PaymentCreate', 'PaymentResponse', 'PaymentCallback', 'ClickPrepareRequest', 'ClickCompleteRequest', 'ClickResponse', 'PayMeRequest', 'PayMeResponse',
@@ -77,7 +77,7 @@ class ProductFilter(BaseModel):
     ''' Поле, по которому происходит сортировка '''
     @validator('sort_by')
     def validate_sort_by(cls, v):
-        allowed_sorts = ['created_at', 'price', 'name', 'average_rating', 'total_reviews']
+        allowed_sorts = ['created_at', 'price', 'name', 'average_rating', 'total_reviews', 'relevance']
         if v not in allowed_sorts:
             raise ValueError(f'Сортировка должна быть одной из: {", ".join(allowed_sorts)}')
         return v
@@ -90,6 +90,22 @@ class ProductFilter(BaseModel):
         return v
 
 
+''' Модель фильтров публичного каталога (GET /products/) '''
+class CatalogFilter(BaseModel):
+    search: Optional[str] = Field(None, description='Поиск по названию, серии и описанию')
+    grade: Optional[GradeEnum] = Field(None, description='Фильтр по Grade')
+    manufacturer: Optional[str] = Field(None, description='Фильтр по производителю (часть названия)')
+    series: Optional[str] = Field(None, description='Фильтр по серии (часть названия)')
+    min_price: Optional[float] = Field(None, ge=0, description='Минимальная цена')
+    max_price: Optional[float] = Field(None, ge=0, description='Максимальная цена')
+    in_stock_only: bool = Field(False, description='Только товары в наличии')
+
+
+''' Модель запроса для получения нескольких товаров по ID '''
+class ProductBatchRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(..., min_length=1, description='Список ID товаров (порядок сохраняется в ответе)')
+
+
 ''' Метод для ответа при загрузки изображения '''
 class ProductImageUpload(BaseModel):
     filename: str = Field(..., description='Название загружаемого файла')
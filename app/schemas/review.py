@@ -53,7 +53,7 @@ class Review(ReviewBase):
     id: uuid.UUID = Field(..., description='Уникальный идентификатор отзыва')
     user_id: uuid.UUID = Field(..., description='Привязка с пользователем')
     product_id: uuid.UUID = Field(..., description='Привязка с продуктом')
-    images: List[str] = Field(None, description='Список URL изображений, связанных с отзывом')
+    images: Optional[List[str]] = Field(None, description='Список URL изображений, связанных с отзывом')
     is_approved: bool = Field(True, description='Настройка модерации отзыва (Одобрен)')
     is_hidden: bool = Field(False, description='Настройка модерации отзыва (Не одобрен)')
     created_at: datetime = Field(..., description='Время создания комментария')
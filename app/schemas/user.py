@@ -69,6 +69,16 @@ class Token(BaseModel):
     token_type: str = Field(..., description='Тип токена (Обычный, Bearer)')
 
 
-''' Вспомогательная схема для работы с токенами '''
+''' Подписанные утверждения токена: авторизация без загрузки пользователя из БД '''
 class TokenData(BaseModel):
-    email: Optional[str] = Field(None, description='Почта, связанная с токеном')
\ No newline at end of file
+    email: Optional[str] = Field(None, description='Почта, связанная с токеном')
+    user_id: uuid.UUID = Field(..., description='ID пользователя')
+    is_admin: bool = Field(False, description='Права администратора на момент выдачи')
+    is_active: bool = Field(True, description='Активен ли пользователь на момент выдачи')
+    jti: str = Field(..., description='Идентификатор токена (для отзыва)')
+    issued_at: int = Field(..., description='Время выдачи, unix-время')
+    issued_at_ms: int = Field(..., description='Время выдачи, unix-время в миллисекундах (для сравнения с отзывом)')
+    expires_at: int = Field(..., description='Время истечения, unix-время')
+
+    class Config:
+        frozen = True  # Один экземпляр разделяется запросами через кеш токенов
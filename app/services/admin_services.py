@@ -1,10 +1,17 @@
-from typing import List, Optional, Dict, Any, Type
+from typing import List, Optional, Dict, Any, Type, Callable, TypeVar
 from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_, or_
 
 from app.models import User, Product, Order, OrderItem, Review
 from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.catalog_cache import catalog_cache
+from app.services.order_service import OrderService
+from app.utils.exceptions import AdminServiceException
+
+
+T = TypeVar("T")
 
 
 
@@ -67,10 +74,8 @@ class AdminService:
                 raise AdminServiceException("Пользователь не найден")
 
             user.is_active = not bool(user.is_active)
-            user.updated_at = datetime.now(timezone.utc)
 
             self.db.commit()
-            self.db.refresh(user)
             return user
         except Exception as e:
             self.db.rollback()
@@ -85,10 +90,8 @@ class AdminService:
                 raise AdminServiceException("Пользователь не найден")
 
             user.is_admin = True
-            user.updated_at = datetime.now(timezone.utc)
 
             self.db.commit()
-            self.db.refresh(user)
             return user
         except Exception as e:
             self.db.rollback()
@@ -132,12 +135,10 @@ class AdminService:
         try:
             # ИСПРАВЛЕНО: изменили на model_dump() для совместимости с Pydantic v2
             product = Product(**product_data.model_dump())
-            product.created_at = datetime.now(timezone.utc)
-            product.updated_at = datetime.now(timezone.utc)
 
             self.db.add(product)
+            catalog_cache.bump(self.db)
             self.db.commit()
-            self.db.refresh(product)
             return product
         except Exception as e:
             self.db.rollback()
@@ -156,10 +157,8 @@ class AdminService:
             for field, value in update_data.items():
                 setattr(product, field, value)
 
-            product.updated_at = datetime.now(timezone.utc)
-
+            catalog_cache.bump(self.db)
             self.db.commit()
-            self.db.refresh(product)
             return product
         except Exception as e:
             self.db.rollback()
@@ -174,12 +173,7 @@ class AdminService:
                 raise AdminServiceException("Товар не найден")
 
             # Проверим, есть ли активные заказы с этим товаром
-            active_orders = self.db.query(OrderItem).join(Order).filter(
-                and_(
-                    OrderItem.product_id == product_id,
-                    Order.status.in_(["pending", "confirmed", "shipped"])
-                )
-            ).count()
+            active_orders = OrderService.count_active_orders_with_product(self.db, product_id)
 
             if active_orders > 0:
                 raise AdminServiceException(
@@ -188,6 +182,7 @@ class AdminService:
                 )
 
             self.db.delete(product)
+            catalog_cache.bump(self.db)
             self.db.commit()
             return True
         except Exception as e:
@@ -203,10 +198,9 @@ class AdminService:
                 raise AdminServiceException("Товар не найден")
 
             product.in_stock = new_stock
-            product.updated_at = datetime.now(timezone.utc)
 
+            catalog_cache.bump(self.db)
             self.db.commit()
-            self.db.refresh(product)
             return product
         except Exception as e:
             self.db.rollback()
@@ -281,14 +275,12 @@ class AdminService:
                 raise AdminServiceException("Заказ не найден")
 
             order.status = new_status
-            order.updated_at = datetime.now(timezone.utc)
 
             # Если заказ доставлен, устанавливаем дату доставки
             if new_status == "delivered":
-                order.estimated_delivery = datetime.now(timezone.utc)
+                order.estimated_delivery = datetime.now(timezone.utc).replace(tzinfo=None)  # колонка без пояса хранит UTC
 
             self.db.commit()
-            self.db.refresh(order)
             return order
         except Exception as e:
             self.db.rollback()
@@ -423,4 +415,15 @@ class AdminService:
 # Правильно будет создавать экземпляр в зависимости от контекста:
 def get_admin_service(db: Session) -> AdminService:
     """Фабричная функция для создания AdminService"""
-    return AdminService(db)
\ No newline at end of file
+    return AdminService(db)
+
+
+class AsyncAdminService:
+    """AdminService поверх AsyncSession: методы выполняются через run_sync, не блокируя event loop"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run(self, action: Callable[[AdminService], T]) -> T:
+        """Выполнить действие над AdminService на синхронной стороне AsyncSession"""
+        return await self.db.run_sync(lambda session: action(AdminService(session)))
\ No newline at end of file
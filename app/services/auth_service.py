@@ -1,19 +1,22 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import and_
+from sqlalchemy import and_, lambda_stmt, select
 
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.models import User
+from app.schemas.user import TokenData
+from app.services.password_hasher import crypt_context, password_hasher
+from app.services.token_cache import token_cache
 from app.database import get_db
 
 
-''' Контекст для хеширования паролей '''
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+''' Контекст для хеширования паролей (синхронно; в async-обработчиках - password_hasher) '''
+pwd_context = crypt_context(settings.BCRYPT_ROUNDS)
 
 
 ''' Настройка OAuth2PasswordBearer для получения токена из заголовков '''
@@ -48,6 +51,56 @@ class AuthService:
         return encoded_jwt
 
 
+    ''' Токен пользователя с подписанными утверждениями: id, роль и активность на момент выдачи.
+        По ним зависимости get_*_principal авторизуют запрос без обращения к БД '''
+    @staticmethod
+    def create_user_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+        issued_at = datetime.now(timezone.utc)
+        return AuthService.create_access_token(
+            data={
+                'sub': user.email,
+                'uid': str(user.id),
+                'adm': bool(user.is_admin),
+                'act': bool(user.is_active),
+                'jti': str(uuid.uuid4()),
+                'iat': int(issued_at.timestamp()),
+                'iat_ms': int(issued_at.timestamp() * 1000),  # точность iat (секунды) мала для сравнения с временем отзыва
+            },
+            expires_delta=expires_delta
+        )
+
+
+    ''' Проверка JWT токена и извлечение утверждений (None - подпись неверна, токен истек или выдан без утверждений).
+        Уже проверенный токен берется из token_cache без повторного декодирования '''
+    @staticmethod
+    def decode_claims(token: str) -> Optional[TokenData]:
+        claims = token_cache.get(token)
+        if claims is not None:
+            return claims
+
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        if not payload.get('uid') or not payload.get('jti'):
+            return None
+        try:
+            claims = TokenData(
+                email=payload.get('sub'),
+                user_id=payload['uid'],
+                is_admin=payload.get('adm', False),
+                is_active=payload.get('act', False),
+                jti=payload['jti'],
+                issued_at=payload.get('iat', 0),
+                issued_at_ms=payload.get('iat_ms', payload.get('iat', 0) * 1000),
+                expires_at=payload['exp'],
+            )
+        except (KeyError, ValueError):
+            return None
+        token_cache.put(token, claims)
+        return claims
+
+
     ''' Проверка JWT токена и извлечение email '''
     @staticmethod
     def verify_token(token: str) -> Optional[str]:
@@ -80,21 +133,28 @@ class AuthService:
         return db.query(User).filter(and_(User.id == user_id)).first()
 
 
-    ''' Аутентификация пользователя '''
+    ''' Аутентификация пользователя: bcrypt в пуле процессов; хеш с устаревшей стоимостью пересчитывается '''
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> type[User] | None:
+    async def authenticate_user(db: Session, email: str, password: str) -> type[User] | None:
         user = db.query(User).filter(and_(User.email == email)).first()
         if not user:
             return None
-        if not AuthService.verify_password(password, user.password_hash):
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
             return None
+        if new_hash is not None:
+            ''' Пароль тот же: UPDATE в обход ORM, чтобы не сработал отзыв токенов при смене пароля '''
+            db.query(User).filter(User.id == user.id) \
+                .update({User.password_hash: new_hash}, synchronize_session=False)
+            db.commit()
         return user
 
 
     ''' Получение пользователя по email '''
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(and_(User.email == email)).first()
+        # Выполняется на каждый авторизованный запрос: скомпилированный запрос кешируется (lambda_stmt)
+        return db.scalars(lambda_stmt(lambda: select(User).where(User.email == email).limit(1))).first()
 
 
     ''' Получение пользователя по username '''
@@ -105,8 +165,9 @@ class AuthService:
 
     ''' Создание нового пользователя '''
     @staticmethod
-    def create_user(db: Session, email: str, username: str, password: str, full_name: str = None) -> User:
-        hashed_password = AuthService.get_password_hash(password)
+    def create_user(db: Session, email: str, username: str, password: str, full_name: str = None,
+                    password_hash: Optional[str] = None) -> User:
+        hashed_password = password_hash or AuthService.get_password_hash(password)
         db_user = User(
             email=email,
             username=username,
@@ -117,7 +178,6 @@ class AuthService:
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
         return db_user
 
 
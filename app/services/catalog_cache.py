@@ -0,0 +1,86 @@
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import CatalogVersion
+
+
+CATALOG_VERSION_KEY = 'catalog'
+_BUMPED = 'catalog_version_bumped'
+
+
+class CatalogCache:
+    """Кеш производных данных каталога, привязанный к версии каталога в БД"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, Any]] = {}
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+
+    ''' Текущая версия каталога (один запрос по первичному ключу) '''
+    @staticmethod
+    def version(db: Session) -> int:
+        version = db.query(CatalogVersion.version) \
+            .filter(CatalogVersion.name == CATALOG_VERSION_KEY) \
+            .scalar()
+        return version or 0
+
+
+    ''' Увеличить версию каталога в текущей транзакции (вызывать до commit) '''
+    @staticmethod
+    def bump(db: Session):
+        updated = db.query(CatalogVersion) \
+            .filter(CatalogVersion.name == CATALOG_VERSION_KEY) \
+            .update({CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False)
+        if not updated:
+            db.add(CatalogVersion(name=CATALOG_VERSION_KEY, version=1))
+        db.info[_BUMPED] = True
+
+
+    ''' Подписка на изменение каталога в этом процессе (вызывается после commit) '''
+    def subscribe(self, callback: Callable[[], None]):
+        self._listeners.append(callback)
+
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback()
+
+
+    ''' Значение из кеша, если версия каталога не менялась, иначе пересчет '''
+    def get_or_compute(self, db: Session, key: str, compute: Callable[[], Any]) -> Any:
+        version = self.version(db)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = compute()
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current[0] <= version:
+                self._entries[key] = (version, value)
+        return value
+
+
+    ''' Сброс кеша (например, в тестах или после ручной правки БД) '''
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_cache = CatalogCache()
+
+
+''' Уведомляем подписчиков только после успешного commit транзакции с bump() '''
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session):
+    if session.info.pop(_BUMPED, False):
+        catalog_cache._notify()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session):
+    session.info.pop(_BUMPED, None)
@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Product
+from app.schemas import CatalogFilter
+from app.services.catalog_cache import catalog_cache
+from app.services.product_serializer import LIST_COLUMNS, ProductSerializer
+from app.services.product_service import ProductService
+
+
+logger = logging.getLogger(__name__)
+
+
+''' Строка снимка: колонки для фильтров/сортировки + готовый элемент ответа '''
+class _Row(NamedTuple):
+    id: uuid.UUID
+    name: str
+    grade: str
+    manufacturer: str
+    series: str
+    price: float
+    rating: float
+    in_stock: int
+    created_at: float
+    item: dict
+
+
+''' Битовая маска (int) из номеров строк '''
+def _bitset(positions, size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+
+class CatalogState:
+    """Неизменяемый колоночный срез каталога с индексами для фильтрации в памяти"""
+
+    def __init__(self, rows: Dict[uuid.UUID, _Row], watermark: Optional[datetime]):
+        self.rows = rows
+        self.watermark = watermark  # max(updated_at) на момент загрузки
+        self.refreshed_at = time.monotonic()
+
+        ordered = list(rows.values())
+        self.size = len(ordered)
+        self.items = [row.item for row in ordered]
+
+        ''' Колонки '''
+        self.ids = [row.id for row in ordered]
+        self.names = [row.name for row in ordered]
+        self.price = array('d', (row.price for row in ordered))
+        self.rating = array('d', (row.rating for row in ordered))
+        self.created_at = array('d', (row.created_at for row in ordered))
+
+        ''' Маски по значениям категорий '''
+        self.all_bits = (1 << self.size) - 1
+        self.by_grade = self._group_bits(row.grade for row in ordered)
+        self.by_manufacturer = self._group_bits(row.manufacturer for row in ordered)
+        self.by_series = self._group_bits(row.series for row in ordered)
+        self.in_stock_bits = _bitset((i for i, row in enumerate(ordered) if row.in_stock > 0), self.size)
+
+        ''' Отсортированный индекс цен для диапазонных фильтров '''
+        self.price_order = sorted(range(self.size), key=self.price.__getitem__)
+        self.price_sorted = [self.price[i] for i in self.price_order]
+
+        self._sort_cache: Dict[Tuple[str, str], List[int]] = {}
+
+
+    ''' Маски для каждого значения колонки '''
+    def _group_bits(self, values) -> Dict[str, int]:
+        groups: Dict[str, List[int]] = {}
+        for i, value in enumerate(values):
+            groups.setdefault(value, []).append(i)
+        return {value: _bitset(positions, self.size) for value, positions in groups.items()}
+
+
+    ''' Объединение масок значений, содержащих подстроку (аналог ILIKE '%...%') '''
+    @staticmethod
+    def _match_bits(groups: Dict[str, int], needle: str) -> int:
+        needle = needle.lower()
+        bits = 0
+        for value, value_bits in groups.items():
+            if needle in value.lower():
+                bits |= value_bits
+        return bits
+
+
+    ''' Маска строк, подходящих под фильтр '''
+    def mask(self, filters: CatalogFilter) -> int:
+        mask = self.all_bits
+
+        if filters.grade:
+            mask &= self.by_grade.get(filters.grade.value, 0)
+
+        if filters.manufacturer:
+            mask &= self._match_bits(self.by_manufacturer, filters.manufacturer)
+
+        if filters.series:
+            mask &= self._match_bits(self.by_series, filters.series)
+
+        if filters.min_price is not None or filters.max_price is not None:
+            lo = bisect_left(self.price_sorted, filters.min_price) if filters.min_price is not None else 0
+            hi = bisect_right(self.price_sorted, filters.max_price) if filters.max_price is not None else self.size
+            mask &= _bitset(self.price_order[lo:hi], self.size)
+
+        if filters.in_stock_only:
+            mask &= self.in_stock_bits
+
+        return mask
+
+
+    ''' Порядок строк для сортировки (с id для стабильности, как в БД) '''
+    def order(self, sort_by: str, sort_order: str) -> List[int]:
+        key = (sort_by, sort_order)
+        if key not in self._sort_cache:
+            column = {
+                'name': self.names,
+                'price': self.price,
+                'rating': self.rating,
+            }.get(sort_by, self.created_at)
+            self._sort_cache[key] = sorted(
+                range(self.size),
+                key=lambda i: (column[i], self.ids[i]),
+                reverse=sort_order == 'desc'
+            )
+        return self._sort_cache[key]
+
+
+    ''' Страница каталога: элементы ответа и общее количество '''
+    def query(self, filters: CatalogFilter, sort_by: str, sort_order: str, offset: int, limit: int) -> Tuple[List[dict], int]:
+        mask = self.mask(filters)
+        total = mask.bit_count()
+        if offset >= total:
+            return [], total
+
+        bits = mask.to_bytes((self.size + 7) // 8 or 1, 'little')
+        page, skipped = [], 0
+        for pos in self.order(sort_by, sort_order):
+            if not bits[pos >> 3] >> (pos & 7) & 1:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(self.items[pos])
+            if len(page) == limit:
+                break
+
+        return page, total
+
+
+    ''' Фасеты для текущего фильтра: количество по grade/производителю/серии и диапазон цен '''
+    def facets(self, filters: CatalogFilter) -> dict:
+        mask = self.mask(filters)
+        bits = mask.to_bytes((self.size + 7) // 8 or 1, 'little')
+        in_mask = [pos for pos in self.price_order if bits[pos >> 3] >> (pos & 7) & 1]
+
+        def counts(groups: Dict[str, int]) -> Dict[str, int]:
+            result = {value: (mask & value_bits).bit_count() for value, value_bits in groups.items() if value}
+            return {value: count for value, count in result.items() if count}
+
+        return ProductService.format_facets(
+            total=len(in_mask),
+            grades=counts(self.by_grade),
+            manufacturers=counts(self.by_manufacturer),
+            series=counts(self.by_series),
+            price_min=self.price[in_mask[0]] if in_mask else None,
+            price_max=self.price[in_mask[-1]] if in_mask else None
+        )
+
+
+class CatalogSnapshot:
+    """Снимок каталога в памяти процесса, обновляемый инкрементально по updated_at"""
+
+    def __init__(self):
+        self._state: Optional[CatalogState] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+
+    ''' Пометить снимок устаревшим (после записи в этом процессе) '''
+    def invalidate(self):
+        self._dirty = True
+
+
+    ''' Актуальный срез каталога или None, если нужно идти в БД '''
+    def get(self, db: Session) -> Optional[CatalogState]:
+        if not settings.CATALOG_SNAPSHOT_ENABLED:
+            return None
+
+        state = self._state
+        if state is not None and not self._dirty \
+                and time.monotonic() - state.refreshed_at < settings.CATALOG_SNAPSHOT_TTL_SECONDS:
+            return state
+
+        ''' Снимок устарел: обновляет один запрос, остальные читают из БД '''
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._dirty = False
+            self._state = self._refresh(db, state)
+            return self._state
+        except SQLAlchemyError as e:
+            db.rollback()
+            self._dirty = True
+            logger.warning("Не удалось обновить снимок каталога: %s", e)
+            return None
+        finally:
+            self._lock.release()
+
+
+    ''' Догружаем изменившиеся строки; при удалениях - полная перезагрузка.
+        updated_at ставится до commit, поэтому строка может стать видимой с отметкой раньше watermark:
+        перечитываем строки за CATALOG_SNAPSHOT_WATERMARK_OVERLAP_SECONDS до него (а не только новее max) '''
+    def _refresh(self, db: Session, state: Optional[CatalogState]) -> CatalogState:
+        count, watermark = db.query(func.count(Product.id), func.max(Product.updated_at)).one()
+
+        if state is None:
+            return self._load(db, watermark)
+
+        changed = db.query(*LIST_COLUMNS)
+        if state.watermark is not None:
+            overlap = timedelta(seconds=settings.CATALOG_SNAPSHOT_WATERMARK_OVERLAP_SECONDS)
+            changed = changed.filter(Product.updated_at >= state.watermark - overlap)
+        changed = [self._row(product) for product in changed.all()]
+
+        if count == state.size and all(state.rows.get(row.id) == row for row in changed):
+            state.refreshed_at = time.monotonic()
+            return state
+
+        rows = dict(state.rows)
+        for row in changed:
+            rows[row.id] = row
+
+        if len(rows) != count:
+            return self._load(db, watermark)
+        return CatalogState(rows, watermark)
+
+
+    ''' Полная загрузка каталога '''
+    def _load(self, db: Session, watermark: Optional[datetime]) -> CatalogState:
+        rows = {product.id: self._row(product) for product in db.query(*LIST_COLUMNS).all()}
+        return CatalogState(rows, watermark)
+
+
+    ''' Строка снимка из кортежа колонок LIST_COLUMNS '''
+    @staticmethod
+    def _row(product) -> _Row:
+        return _Row(
+            id=product.id,
+            name=product.name,
+            grade=product.grade.value,
+            manufacturer=product.manufacturer or '',
+            series=product.series or '',
+            price=float(product.price),
+            rating=float(product.average_rating or 0),
+            in_stock=product.in_stock or 0,
+            created_at=product.created_at.timestamp(),
+            item=ProductSerializer.to_item(product)
+        )
+
+
+catalog_snapshot = CatalogSnapshot()
+catalog_cache.subscribe(catalog_snapshot.invalidate)
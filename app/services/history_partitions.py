@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+''' Секции view_history: view_history_pYYYYMM, диапазон [1 число месяца, 1 число следующего) '''
+PARTITION_PREFIX = 'view_history_p'
+DEFAULT_PARTITION = 'view_history_default'  # строки вне созданных месяцев
+_PARTITION_NAME = re.compile(rf'^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$')
+
+''' Ключ advisory-блокировки: обслуживание секций из нескольких воркеров не пересекается '''
+_MAINTENANCE_LOCK_KEY = 0x76686973  # 'vhis'
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f'{PARTITION_PREFIX}{month:%Y%m}'
+
+
+class ViewHistoryPartitions:
+    """Помесячные секции view_history: создание заранее и удаление устаревших вместо DELETE"""
+
+    ''' Секционирована ли таблица (PostgreSQL после миграции); иначе работает обычная очистка '''
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        if db.get_bind().dialect.name != 'postgresql':
+            return False
+        return bool(db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('view_history'))"
+        )).scalar())
+
+
+    ''' Существующие секции: (месяц, имя), по возрастанию '''
+    @staticmethod
+    def list_partitions(db: Session) -> List[tuple]:
+        names = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('view_history')"
+        )).scalars()
+
+        partitions = []
+        for name in names:
+            match = _PARTITION_NAME.match(name)
+            if match:
+                partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+        return sorted(partitions)
+
+
+    @staticmethod
+    def _has_default(db: Session) -> bool:
+        return db.execute(text('SELECT to_regclass(:name) IS NOT NULL'), {'name': DEFAULT_PARTITION}).scalar()
+
+
+    ''' Секция месяца. При секции по умолчанию строки этого месяца, попавшие туда, переносятся в новую секцию
+        (иначе PostgreSQL не даст ее подключить) '''
+    @staticmethod
+    def _create_partition(db: Session, name: str, month: date, has_default: bool):
+        bounds = f"FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        if not has_default:
+            db.execute(text(f'CREATE TABLE {name} PARTITION OF view_history FOR VALUES {bounds}'))
+            return
+
+        db.execute(text(f'CREATE TABLE {name} (LIKE view_history INCLUDING DEFAULTS)'))
+        db.execute(text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE viewed_at >= :start AND viewed_at < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ), {'start': month, 'end': _add_months(month, 1)})
+        db.execute(text(f'ALTER TABLE view_history ATTACH PARTITION {name} FOR VALUES {bounds}'))
+
+
+    ''' Создает секции с текущего месяца на months_ahead месяцев вперед; возвращает созданные '''
+    @staticmethod
+    def ensure_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+        if months_ahead is None:
+            months_ahead = settings.VIEW_HISTORY_PARTITIONS_AHEAD
+
+        db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _MAINTENANCE_LOCK_KEY})
+        existing = {name for _, name in ViewHistoryPartitions.list_partitions(db)}
+        has_default = ViewHistoryPartitions._has_default(db)
+
+        created = []
+        current = _month_start(datetime.now(timezone.utc).date())
+        for offset in range(months_ahead + 1):
+            month = _add_months(current, offset)
+            name = _partition_name(month)
+            if name in existing:
+                continue
+            ViewHistoryPartitions._create_partition(db, name, month, has_default)
+            created.append(name)
+
+        db.commit()
+        if created:
+            logger.info('Созданы секции view_history: %s', ', '.join(created))
+        return created
+
+
+    ''' Отсоединяет и удаляет секции, целиком старше days дней; возвращает оценку числа удаленных строк '''
+    @staticmethod
+    def drop_expired(db: Session, days: int) -> int:
+        threshold = datetime.now(timezone.utc).date() - timedelta(days=days)
+
+        db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _MAINTENANCE_LOCK_KEY})
+        expired = [
+            name for month, name in ViewHistoryPartitions.list_partitions(db)
+            if _add_months(month, 1) <= threshold
+        ]
+
+        dropped_rows = 0
+        for name in expired:
+            ''' Оценка из статистики; секцию без ANALYZE считаем точно '''
+            rows = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"), {'name': name}
+            ).scalar()
+            if rows is None or rows < 0:
+                rows = db.execute(text(f'SELECT count(*) FROM {name}')).scalar()
+            dropped_rows += rows
+            db.execute(text(f'ALTER TABLE view_history DETACH PARTITION {name}'))
+            db.execute(text(f'DROP TABLE {name}'))
+
+        ''' Устаревшие строки секции по умолчанию удаляются обычным DELETE (их там немного) '''
+        if ViewHistoryPartitions._has_default(db):
+            dropped_rows += db.execute(
+                text(f'DELETE FROM {DEFAULT_PARTITION} WHERE viewed_at < :threshold'), {'threshold': threshold}
+            ).rowcount
+
+        db.commit()
+        if expired:
+            logger.info('Удалены секции view_history: %s', ', '.join(expired))
+        return dropped_rows
+
+
+class ViewHistoryMaintenance:
+    """Фоновое обслуживание секций: создание будущих месяцев и (если задано) удаление устаревших"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+
+    ''' Один проход обслуживания (синхронная сессия, вызывается через run_sync) '''
+    @staticmethod
+    def run_once(db: Session):
+        if not ViewHistoryPartitions.is_partitioned(db):
+            return
+        ViewHistoryPartitions.ensure_partitions(db)
+        if settings.VIEW_HISTORY_RETENTION_DAYS:
+            ViewHistoryPartitions.drop_expired(db, settings.VIEW_HISTORY_RETENTION_DAYS)
+
+
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(self.run_once)
+            except SQLAlchemyError as e:
+                logger.warning('Не удалось обслужить секции view_history: %s', e)
+            await asyncio.sleep(settings.VIEW_HISTORY_MAINTENANCE_INTERVAL_SECONDS)
+
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+view_history_maintenance = ViewHistoryMaintenance()
@@ -1,44 +1,42 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, func
+from sqlalchemy import desc, and_, func, lambda_stmt, select
 from typing import List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import uuid
 from app.models import ViewHistory, Favorites
+from app.config import settings
+from app.models.base import utc_now
 from app.schemas import FavoritesToggleResponse
+from app.services.history_partitions import ViewHistoryPartitions
 
 class HistoryService:
     @staticmethod
     def add_view_history(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> Optional[ViewHistory]:
         """
         Добавляет запись о просмотре товара.
-        Если товар уже просматривался в течение последних 10 минут - не добавляем дубликат.
+        Если товар уже просматривался в течение последних 10 минут - не добавляем дубликат
+        и возвращаем существующую запись без изменений: viewed_at - ключ секционирования,
+        его UPDATE переносил бы строку между секциями.
         """
-        ''' Проверяем, не было ли недавнего просмотра '''
-        ten_minutes_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+        ''' Проверяем, не было ли недавнего просмотра (время БД, как у viewed_at) '''
         recent_view = db.query(ViewHistory).filter(
             and_(
                 ViewHistory.user_id == user_id,
                 ViewHistory.product_id == product_id,
-                ViewHistory.viewed_at > ten_minutes_ago
+                ViewHistory.viewed_at > utc_now() - timedelta(minutes=10)
             )
         ).first()
 
         if recent_view:
-            ''' Обновляем время последнего просмотра '''
-            recent_view.viewed_at = datetime.now(timezone.utc)
-            db.commit()
-            db.refresh(recent_view)
             return recent_view
 
         ''' Создаем новую запись '''
         view_record = ViewHistory(
             user_id=user_id,
-            product_id=product_id,
-            viewed_at=datetime.now(timezone.utc)
+            product_id=product_id
         )
         db.add(view_record)
         db.commit()
-        db.refresh(view_record)
         return view_record
 
 
@@ -47,7 +45,10 @@ class HistoryService:
         """
         Получает историю просмотров пользователя с пагинацией.
         Просмотр. Группирует по товарам и показывает последний
+        Только за срок хранения (или VIEW_HISTORY_LOOKBACK_DAYS): нижняя граница viewed_at
+        в подзапросе и основном запросе отсекает старые секции
         """
+        since = utc_now() - timedelta(days=settings.VIEW_HISTORY_RETENTION_DAYS or settings.VIEW_HISTORY_LOOKBACK_DAYS)
 
         ''' Подзапрос для получения последнего просмотра каждого товара '''
         subquery = (
@@ -55,7 +56,7 @@ class HistoryService:
                 ViewHistory.product_id,
                 func.max(ViewHistory.viewed_at).label('last_viewed')
             )
-            .filter(and_(ViewHistory.user_id == user_id))
+            .filter(and_(ViewHistory.user_id == user_id, ViewHistory.viewed_at >= since))
             .group_by(ViewHistory.product_id)
             .subquery()
         )
@@ -70,6 +71,7 @@ class HistoryService:
                     ViewHistory.user_id == user_id,
                 ),
             )
+            .filter(ViewHistory.viewed_at >= since)
             .order_by(desc(ViewHistory.viewed_at))
         )
 
@@ -105,7 +107,12 @@ class HistoryService:
     def clear_old_history(db: Session, days: int = 90, view_history=ViewHistory) -> int:
         """
         Очищает старую историю просмотров (старше указанного количества дней).
+        Секционированная таблица: удаляются целые месяцы, полностью вышедшие за срок (без DELETE),
+        поэтому строки хранятся не меньше days дней, а возвращается оценка числа удаленных строк.
         """
+        if ViewHistoryPartitions.is_partitioned(db):
+            return ViewHistoryPartitions.drop_expired(db, days)
+
         date_threshold = datetime.now(timezone.utc) - timedelta(days=days)
         deleted_count = db.query(ViewHistory).filter(view_history.viewed_at < date_threshold).delete()
         db.commit()
@@ -114,6 +121,14 @@ class HistoryService:
 
 class FavoritesService:
 
+    ''' Запись избранного пользователя по товару (скомпилированный запрос кешируется через lambda_stmt) '''
+    @staticmethod
+    def _find_favorite(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> Optional[Favorites]:
+        return db.scalars(lambda_stmt(
+            lambda: select(Favorites).where(Favorites.user_id == user_id, Favorites.product_id == product_id).limit(1)
+        )).first()
+
+
     """ Переключает товар в избранном (добавляет или удаляет) """
     @staticmethod
     def toggle_favorite(
@@ -122,7 +137,7 @@ class FavoritesService:
             product_id: uuid.UUID
     ) -> FavoritesToggleResponse:
         # Проверяем, есть ли товар в избранном
-        existing_favorite = db.query(Favorites).filter(and_(Favorites.user_id == user_id, Favorites.product_id == product_id)).first()
+        existing_favorite = FavoritesService._find_favorite(db, user_id, product_id)
 
         if existing_favorite:
             # Удаляем из избранного
@@ -150,12 +165,7 @@ class FavoritesService:
     @staticmethod
     def add_to_favorites(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> Optional[Favorites]:
         """ Проверяем, не добавлен ли уже """
-        existing: Optional[Favorites] = db.query(Favorites).filter(
-            and_(
-                Favorites.user_id == user_id,
-                Favorites.product_id == product_id
-            )
-        ).first()
+        existing: Optional[Favorites] = FavoritesService._find_favorite(db, user_id, product_id)
 
         if existing:
             return existing
@@ -166,14 +176,13 @@ class FavoritesService:
         )
         db.add(favorite)
         db.commit()
-        db.refresh(favorite)
         return favorite
 
 
     ''' Удаляет товар из избранного '''
     @staticmethod
     def remove_from_favorites(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> bool:
-        favorite = db.query(Favorites).filter(and_(Favorites.user_id == user_id,Favorites.product_id == product_id)).first()
+        favorite = FavoritesService._find_favorite(db, user_id, product_id)
 
         if favorite:
             db.delete(favorite)
@@ -196,9 +205,11 @@ class FavoritesService:
     ''' Проверяет, находится ли товар в избранном у пользователя '''
     @staticmethod
     def is_favorite(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> bool:
-        favorite = db.query(Favorites).filter(and_(Favorites.user_id == user_id,Favorites.product_id == product_id)).first()
+        favorite_id = db.scalar(lambda_stmt(
+            lambda: select(Favorites.id).where(Favorites.user_id == user_id, Favorites.product_id == product_id).limit(1)
+        ))
 
-        return favorite is not None
+        return favorite_id is not None
 
 
     ''' Получает количество избранных товаров у пользователя '''
@@ -0,0 +1,56 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import desc, func, lambda_stmt, select
+from typing import List, Optional, Tuple
+import uuid
+from app.models import Cart, Order, OrderItem, OrderStatusEnum, Product
+
+
+''' Статусы заказов, которые еще не завершены '''
+ACTIVE_ORDER_STATUSES = (OrderStatusEnum.PENDING, OrderStatusEnum.CONFIRMED, OrderStatusEnum.SHIPPED)
+
+
+class OrderService:
+    """Горячие выборки заказов и корзины (их планы проверяет tests/test_query_plans.py)"""
+
+    ''' Заказы пользователя, новые первыми (индекс ix_orders_user_created) '''
+    @staticmethod
+    def get_user_orders(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 10) -> List[Order]:
+        return db.query(Order).filter(Order.user_id == user_id) \
+            .order_by(desc(Order.created_at)).offset(skip).limit(limit).all()
+
+
+    @staticmethod
+    def count_user_orders(db: Session, user_id: uuid.UUID, status: Optional[OrderStatusEnum] = None) -> int:
+        query = db.query(func.count(Order.id)).filter(Order.user_id == user_id)
+        if status is not None:
+            query = query.filter(Order.status == status)
+        return query.scalar()
+
+
+    ''' Позиции заказа (индекс ix_order_items_order_id) '''
+    @staticmethod
+    def get_order_items(db: Session, order_id: uuid.UUID) -> List[OrderItem]:
+        return db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+
+
+    ''' Сколько незавершенных заказов содержат товар (индекс ix_order_items_product_id) '''
+    @staticmethod
+    def count_active_orders_with_product(db: Session, product_id: uuid.UUID) -> int:
+        return db.query(func.count(OrderItem.id)).join(Order).filter(
+            OrderItem.product_id == product_id,
+            Order.status.in_(ACTIVE_ORDER_STATUSES)
+        ).scalar()
+
+
+    ''' Корзина пользователя вместе с товарами (индекс ix_cart_user_product) '''
+    @staticmethod
+    def get_cart_items(db: Session, user_id: uuid.UUID) -> List[Tuple[Cart, Product]]:
+        return db.query(Cart, Product).join(Product, Cart.product_id == Product.id).filter(Cart.user_id == user_id).all()
+
+
+    ''' Позиция корзины по товару (скомпилированный запрос кешируется через lambda_stmt) '''
+    @staticmethod
+    def find_cart_item(db: Session, user_id: uuid.UUID, product_id: uuid.UUID) -> Optional[Cart]:
+        return db.scalars(lambda_stmt(
+            lambda: select(Cart).where(Cart.user_id == user_id, Cart.product_id == product_id).limit(1)
+        )).first()
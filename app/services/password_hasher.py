@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from prometheus_client import Counter, Histogram
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    'password_hash_seconds',
+    'Хеширование и проверка паролей: ожидание допуска + работа в пуле процессов',
+    ['operation'],  # hash | verify
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total',
+    'Операции с паролем, не допущенные за PASSWORD_HASH_ADMISSION_TIMEOUT_SECONDS'
+)
+
+''' Ответ при перегрузке: клиент повторит вход позже, остальные запросы воркера не ждут '''
+HASHER_BUSY = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Сервис авторизации перегружен, повторите попытку позже",
+    headers={"Retry-After": "1"},
+)
+
+
+''' Контекст bcrypt с заданной стоимостью; хеши с другой стоимостью считаются устаревшими (needs_update) '''
+@lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=rounds)
+
+
+''' Функции, выполняемые в процессах пула (стоимость передается явно: у процесса свои настройки) '''
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return crypt_context(rounds).verify_and_update(password, password_hash)
+
+
+class PasswordHasher:
+    """bcrypt в пуле процессов: event loop не блокируется, число одновременных операций ограничено"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._admission: Optional[asyncio.Semaphore] = None
+
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            ''' spawn: дочерние процессы не наследуют потоки и соединения воркера '''
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+
+    ''' Выполнить функцию в пуле; если за таймаут нет места - 503 вместо растущей очереди '''
+    async def _run(self, operation: str, fn, *args):
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._admission.acquire(), settings.PASSWORD_HASH_ADMISSION_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            PASSWORD_HASH_REJECTED.inc()
+            raise HASHER_BUSY
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._admission.release()
+            PASSWORD_HASH_SECONDS.labels(operation=operation).observe(time.perf_counter() - started)
+
+
+    ''' Хеш нового пароля с текущей стоимостью BCRYPT_ROUNDS '''
+    async def hash(self, password: str) -> str:
+        return await self._run('hash', _hash, password, settings.BCRYPT_ROUNDS)
+
+
+    ''' Проверка пароля; вторым значением - новый хеш, если стоимость сохраненного устарела '''
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        return await self._run('verify', _verify_and_update, password, password_hash, settings.BCRYPT_ROUNDS)
+
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._admission = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+
+
+PRINCIPAL_CACHE_REQUESTS = Counter(
+    'principal_cache_requests_total',
+    'Обращения к кешу авторизованных пользователей',
+    ['result']  # hit | miss
+)
+PRINCIPAL_CACHE_INVALIDATIONS = Counter('principal_cache_invalidations_total', 'Сбросы записей кеша пользователей')
+
+_CHANGED = 'principal_cache_changed'
+
+
+class PrincipalCache:
+    """TTL/LRU кеш пользователей по subject токена: авторизованный запрос обходится без SELECT users"""
+
+    def __init__(self):
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    ''' Пользователь из кеша, привязанный к сессии db без запроса к БД (None - нет или устарел) '''
+    def get(self, db: Session, subject: str) -> Optional[User]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(subject)
+                self.hits += 1
+            else:
+                if entry is not None:
+                    del self._entries[subject]
+                entry = None
+                self.misses += 1
+
+        if entry is None:
+            PRINCIPAL_CACHE_REQUESTS.labels(result='miss').inc()
+            return None
+        PRINCIPAL_CACHE_REQUESTS.labels(result='hit').inc()
+
+        ''' Каждому запросу своя копия: изменения в обработчике (например, профиль) сохраняются обычным commit '''
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+    ''' Запомнить загруженного из БД пользователя '''
+    def put(self, subject: str, user: User):
+        if settings.PRINCIPAL_CACHE_MAX_SIZE <= 0:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        expires_at = time.monotonic() + settings.PRINCIPAL_CACHE_TTL_SECONDS
+        with self._lock:
+            self._entries[subject] = (expires_at, values)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > settings.PRINCIPAL_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+
+    ''' Сброс записей (subject = email пользователя) '''
+    def invalidate(self, *subjects: str):
+        with self._lock:
+            for subject in subjects:
+                if self._entries.pop(subject, None) is not None:
+                    PRINCIPAL_CACHE_INVALIDATIONS.inc()
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    ''' Доля попаданий с запуска процесса (для отладки; в Prometheus - principal_cache_requests_total) '''
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
+
+PRINCIPAL_CACHE_SIZE = Gauge('principal_cache_entries', 'Записей в кеше авторизованных пользователей')
+PRINCIPAL_CACHE_SIZE.set_function(lambda: len(principal_cache))
+
+
+''' Любое изменение или удаление User в сессии (блокировка, права, профиль, пароль)
+    сбрасывает его запись после commit; в других процессах запись живет не дольше TTL '''
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session: Session, flush_context):
+    changed: Set[str] = session.info.setdefault(_CHANGED, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.email.history
+            changed.update(email for email in (obj.email, *history.deleted) if email)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session):
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        principal_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session):
+    session.info.pop(_CHANGED, None)
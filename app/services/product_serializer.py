@@ -0,0 +1,140 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from app.models import Product, GradeEnum
+from app.services.file_service import file_service
+
+
+''' Колонки, которые выбираются для списков товаров (без description и additional_images - сетка их не показывает) '''
+LIST_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.price,
+    Product.grade,
+    Product.manufacturer,
+    Product.series,
+    Product.scale,
+    Product.difficulty,
+    Product.in_stock,
+    Product.main_image,
+    Product.average_rating,
+    Product.total_reviews,
+    Product.created_at,
+    Product.updated_at,
+)
+LIST_FIELDS = tuple(column.key for column in LIST_COLUMNS)
+IMAGE_FIELDS = ('main_image_url', 'thumbnail_url')
+ITEM_FIELDS = LIST_FIELDS + IMAGE_FIELDS
+_COLUMNS_BY_FIELD = {column.key: column for column in LIST_COLUMNS}
+
+
+''' Элемент списка товаров в ответе API (при fields= - только запрошенные ключи) '''
+class ProductListItem(TypedDict, total=False):
+    id: uuid.UUID
+    name: str
+    price: Decimal
+    grade: GradeEnum
+    manufacturer: str
+    series: Optional[str]
+    scale: Optional[str]
+    difficulty: Optional[int]
+    in_stock: int
+    main_image: Optional[str]
+    average_rating: Decimal
+    total_reviews: int
+    created_at: datetime
+    updated_at: datetime
+    main_image_url: str
+    thumbnail_url: str
+
+
+''' Ответ со списком товаров: элементы + произвольные служебные блоки (пагинация, фильтры) '''
+class ProductListPage(TypedDict, total=False):
+    products: List[ProductListItem]
+    pagination: Dict[str, Any]
+    filters: Dict[str, Any]
+
+
+''' Схемы сериализации собираются один раз при импорте (pydantic-core) '''
+_page_adapter = TypeAdapter(ProductListPage)
+
+
+class ProductSerializer:
+    """Сериализация списков товаров из кортежей колонок сразу в JSON-байты"""
+
+    ''' Разбор параметра fields= ("id,name,price"); None - все поля; ValueError для неизвестных полей '''
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - set(ITEM_FIELDS)
+        if unknown:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(sorted(unknown))}. Доступны: {", ".join(ITEM_FIELDS)}'
+            )
+
+        requested.add('id')
+        return tuple(field for field in ITEM_FIELDS if field in requested)
+
+
+    ''' Колонки для запроса под набор полей (+ колонки, нужные для курсора и URL изображений) '''
+    @staticmethod
+    def columns_for(fields: Optional[Tuple[str, ...]], *extra: str) -> List:
+        if fields is None:
+            return list(LIST_COLUMNS)
+
+        needed = set(fields) | set(extra)
+        if needed & set(IMAGE_FIELDS):
+            needed.add('main_image')
+        return [column for field, column in _COLUMNS_BY_FIELD.items() if field in needed]
+
+
+    ''' Элемент списка из строки запроса по LIST_COLUMNS (или их части) '''
+    @staticmethod
+    def to_item(row, fields: Optional[Tuple[str, ...]] = None) -> dict:
+        item = row._asdict()
+        if item.get('average_rating', 0) is None:
+            item['average_rating'] = Decimal('0.0')
+        if item.get('total_reviews', 0) is None:
+            item['total_reviews'] = 0
+        if 'main_image' in item:
+            item['main_image_url'] = file_service.get_image_url(item['main_image'])
+            item['thumbnail_url'] = file_service.get_image_url(item['main_image'], 'thumbnail')
+        return ProductSerializer.project(item, fields)
+
+
+    @staticmethod
+    def to_items(rows: Iterable, fields: Optional[Tuple[str, ...]] = None) -> List[dict]:
+        return [ProductSerializer.to_item(row, fields) for row in rows]
+
+
+    ''' Оставляем только запрошенные поля элемента '''
+    @staticmethod
+    def project(item: dict, fields: Optional[Tuple[str, ...]]) -> dict:
+        if fields is None:
+            return item
+        return {field: item[field] for field in fields}
+
+
+    ''' Ответ целиком в JSON-байты без повторной валидации через response_model '''
+    @staticmethod
+    def dump_page(page: dict) -> bytes:
+        return _page_adapter.dump_json(page)
+
+
+    ''' Готовый JSON-ответ (заголовки, например ETag, переносятся из Response зависимости) '''
+    @staticmethod
+    def json_response(page: dict, headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(
+            content=ProductSerializer.dump_page(page),
+            media_type='application/json',
+            headers=dict(headers) if headers else None
+        )
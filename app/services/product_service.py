@@ -1,9 +1,47 @@
-from typing import List, Optional, Tuple, Type
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc, asc, func
-from app.models import Product
-from app.schemas import ProductCreate, ProductUpdate, ProductFilter
-from app.services.file_service import FileService
+import base64
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import desc, asc, func, tuple_, literal, and_, true, null, cast, case, select, union_all, String, lambda_stmt
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement, ColumnElement
+from app.config import settings
+from app.models import Product, GradeEnum
+from app.schemas import ProductCreate, ProductUpdate, ProductFilter, CatalogFilter, ProductResponse
+from app.services.catalog_cache import catalog_cache
+from app.services.file_service import FileService, file_service
+from app.services.product_serializer import LIST_COLUMNS, ProductSerializer
+from app.services.search_service import ProductSearch
+
+
+''' Поля сортировки каталога: sort_by -> (выражение, атрибут товара, разбор значения из курсора) '''
+SORT_FIELDS = {
+    'name': (Product.name, 'name', str),
+    'price': (Product.price, 'price', Decimal),
+    'rating': (func.coalesce(Product.average_rating, 0), 'average_rating', Decimal),
+    'average_rating': (func.coalesce(Product.average_rating, 0), 'average_rating', Decimal),
+    'total_reviews': (func.coalesce(Product.total_reviews, 0), 'total_reviews', int),
+    'created_at': (Product.created_at, 'created_at', datetime.fromisoformat),
+}
+
+
+''' EXPLAIN (FORMAT JSON) над выражением: параметры (в т.ч. IN (...) и Enum) обрабатываются как при обычном выполнении '''
+class ExplainJson(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainJson)
+def _compile_explain_json(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) ' + compiler.process(element.statement, **kw)
 
 
 class ProductService:
@@ -24,16 +62,17 @@ class ProductService:
         )
 
         db.add(db_product)
+        catalog_cache.bump(db)
         db.commit()
-        db.refresh(db_product)
 
         return db_product
 
 
-    ''' Получение товара по ID '''
+    ''' Получение товара по ID (карточка товара: все колонки, включая описание и доп. изображения) '''
     @staticmethod
     def get_product_by_id(db: Session, product_id: str) -> Optional[Product]:
-        return db.query(Product).filter(product_id == Product.id).first()
+        # lambda_stmt: запрос строится и компилируется один раз, дальше меняется только параметр
+        return db.scalars(lambda_stmt(lambda: select(Product).where(Product.id == product_id))).first()
 
 
     ''' Обновление продукта '''
@@ -47,8 +86,8 @@ class ProductService:
         update_data = product_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_product, field, value)
+        catalog_cache.bump(db)
         db.commit()
-        db.refresh(db_product)
         return db_product
 
 
@@ -68,6 +107,7 @@ class ProductService:
                 FileService.delete_file(image_path)
 
         db.delete(db_product)
+        catalog_cache.bump(db)
         db.commit()
 
         return True
@@ -79,18 +119,19 @@ class ProductService:
             db: Session,
             filters: ProductFilter,
             page: int = 1,
-            per_page: int = 12
-    ) -> Tuple[List[Product], int]:
-        query = db.query(Product)
+            per_page: int = 12,
+            total_mode: str = 'exact'
+    ) -> Tuple[List[Product], Optional[int]]:
+        query = ProductService.list_query(db)
 
         ''' Применяем фильтры '''
         query = ProductService._apply_filters(query, filters)
 
         ''' Общее количество товаров (до пагинации) '''
-        total = query.count()
+        total = ProductService.count_products(db, query, total_mode)
 
         ''' Применяем сортировку '''
-        query = ProductService._apply_sorting(query, filters.sort_by, filters.sort_order)
+        query = ProductService.apply_sorting(query, filters.sort_by, filters.sort_order, filters.search)
 
         ''' Применяем пагинацию '''
         offset = (page - 1) * per_page
@@ -99,19 +140,133 @@ class ProductService:
         return products, total
 
 
+    ''' Получение товаров с фильтрацией и курсорной (keyset) пагинацией '''
+    @staticmethod
+    def get_products_by_cursor(
+            db: Session,
+            filters: ProductFilter,
+            cursor: Optional[str] = None,
+            per_page: int = 12,
+            total_mode: str = 'none'
+    ) -> Tuple[List[Product], Optional[str], Optional[int]]:
+        query = ProductService._apply_filters(ProductService.list_query(db), filters)
+
+        total = ProductService.count_products(db, query, total_mode)
+        products, next_cursor = ProductService.paginate_by_cursor(
+            query, filters.sort_by, filters.sort_order, cursor, per_page
+        )
+        return products, next_cursor, total
+
+
+    ''' Запрос товаров для списков: только колонки сетки, тяжелые поля не загружаются '''
+    @staticmethod
+    def list_query(db: Session):
+        return db.query(Product).options(load_only(*LIST_COLUMNS))
+
+
+    ''' Страница товаров после курсора: сравнение по паре (колонка сортировки, id) вместо OFFSET '''
+    @staticmethod
+    def paginate_by_cursor(
+            query,
+            sort_by: str,
+            sort_order: str,
+            cursor: Optional[str],
+            limit: int
+    ) -> Tuple[List[Product], Optional[str]]:
+        if sort_by == 'relevance':
+            raise ValueError('Курсорная пагинация не поддерживает сортировку по релевантности')
+
+        sort_expr = SORT_FIELDS.get(sort_by, SORT_FIELDS['created_at'])[0]
+
+        if cursor:
+            value, last_id = ProductService.decode_cursor(cursor, sort_by, sort_order)
+            boundary = tuple_(literal(value, sort_expr.type), literal(last_id, Product.id.type))
+            if sort_order == 'desc':
+                query = query.filter(tuple_(sort_expr, Product.id) < boundary)
+            else:
+                query = query.filter(tuple_(sort_expr, Product.id) > boundary)
+
+        query = ProductService.apply_sorting(query, sort_by, sort_order)
+
+        ''' Берем на одну запись больше, чтобы узнать, есть ли следующая страница '''
+        products = query.limit(limit + 1).all()
+        if len(products) <= limit:
+            return products, None
+
+        products = products[:limit]
+        return products, ProductService.encode_cursor(products[-1], sort_by, sort_order)
+
+
+    ''' Кодирование непрозрачного курсора по последнему товару страницы '''
+    @staticmethod
+    def encode_cursor(product: Product, sort_by: str, sort_order: str) -> str:
+        attr = SORT_FIELDS.get(sort_by, SORT_FIELDS['created_at'])[1]
+        value = getattr(product, attr)
+        if value is None:
+            value = 0
+        payload = {
+            's': sort_by,
+            'o': sort_order,
+            'v': value.isoformat() if isinstance(value, datetime) else str(value),
+            'id': str(product.id)
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+    ''' Декодирование курсора; ValueError, если курсор поврежден или от другой сортировки '''
+    @staticmethod
+    def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[object, uuid.UUID]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            parse = SORT_FIELDS.get(sort_by, SORT_FIELDS['created_at'])[2]
+            value, last_id = parse(payload['v']), uuid.UUID(payload['id'])
+        except (ValueError, TypeError, KeyError, ArithmeticError):
+            raise ValueError('Неверный курсор пагинации')
+
+        if payload.get('s') != sort_by or payload.get('o') != sort_order:
+            raise ValueError('Курсор не соответствует текущей сортировке')
+        return value, last_id
+
+
+    ''' Подсчет товаров: exact - COUNT(*), estimate - оценка планировщика, none - без подсчета '''
+    @staticmethod
+    def count_products(db: Session, query, total_mode: str = 'exact') -> Optional[int]:
+        if total_mode == 'none':
+            return None
+
+        if total_mode == 'estimate':
+            estimate = ProductService._estimate_count(db, query)
+            if estimate is not None:
+                return estimate
+
+        return query.order_by(None).count()
+
+
+    ''' Оценка количества строк по плану запроса PostgreSQL (без выполнения самого запроса) '''
+    @staticmethod
+    def _estimate_count(db: Session, query) -> Optional[int]:
+        bind = db.get_bind()
+        if bind.dialect.name != 'postgresql':
+            return None
+
+        try:
+            with db.begin_nested():  # ошибка EXPLAIN не должна прерывать транзакцию запроса
+                plan = db.execute(ExplainJson(query.order_by(None).statement)).scalar()
+        except SQLAlchemyError:
+            return None  # вызывающий код посчитает точно
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
     ''' Применение фильтров к запросу '''
     @staticmethod
     def _apply_filters(query, filters: ProductFilter):
-        """ Поиск по названию и описанию """
-        if filters.search:
-            search_term = f"%{filters.search.lower()}%"
-            query = query.filter(
-                or_(
-                    func.lower(Product.name).contains(search_term),
-                    func.lower(Product.description).contains(search_term),
-                    func.lower(Product.series).contains(search_term)
-                )
-            )
+        """ Поиск по названию, серии и описанию (индексный в PostgreSQL) """
+        if ProductSearch.has_terms(filters.search):
+            query = ProductSearch.apply(query, filters.search)
 
         ''' Фильтр по грейдам '''
         if filters.grade:
@@ -142,17 +297,84 @@ class ProductService:
         return query
 
 
-    ''' Применение сортировки к запросу '''
+    ''' Условия фильтрации публичного каталога (частичное совпадение производителя и серии) '''
     @staticmethod
-    def _apply_sorting(query, sort_by: str, sort_order: str):
-        """ Определяем поле для сортировки """
-        sort_field = getattr(Product, sort_by, Product.created_at)
+    def catalog_conditions(filters: CatalogFilter, dialect_name: str) -> List[ColumnElement]:
+        conditions = []
 
-        ''' Применяем сортировку '''
+        if ProductSearch.has_terms(filters.search):
+            conditions.append(ProductSearch.condition(dialect_name, filters.search))
+
+        if filters.grade:
+            conditions.append(Product.grade == filters.grade)
+
+        if filters.manufacturer:
+            conditions.append(Product.manufacturer.ilike(f"%{filters.manufacturer}%"))
+
+        if filters.series:
+            conditions.append(Product.series.ilike(f"%{filters.series}%"))
+
+        if filters.min_price is not None:
+            conditions.append(Product.price >= filters.min_price)
+
+        if filters.max_price is not None:
+            conditions.append(Product.price <= filters.max_price)
+
+        if filters.in_stock_only:
+            conditions.append(Product.in_stock > 0)
+
+        return conditions
+
+
+    ''' Получение нескольких товаров одним запросом (в порядке переданных ID) '''
+    @staticmethod
+    def get_products_by_ids(db: Session, product_ids: List[uuid.UUID]) -> List[Product]:
+        if not product_ids:
+            return []
+
+        products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+        by_id = {product.id: product for product in products}
+        return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+
+    ''' Карточка товара в ответе API (данные товара + все варианты URL изображений) '''
+    @staticmethod
+    def to_detail_item(product: Product) -> dict:
+        additional_images = []
+        if product.additional_images:
+            for img in product.additional_images:
+                additional_images.append({
+                    "thumbnail": file_service.get_image_url(img, "thumbnail"),
+                    "medium": file_service.get_image_url(img, "medium"),
+                    "large": file_service.get_image_url(img, "large")
+                })
+
+        return {
+            **ProductResponse.model_validate(product).model_dump(),
+            "main_image_url": file_service.get_image_url(product.main_image, "large"),
+            "main_image_thumbnail": file_service.get_image_url(product.main_image, "thumbnail"),
+            "additional_images_urls": additional_images
+        }
+
+
+    ''' Применение сортировки к запросу '''
+    @staticmethod
+    def apply_sorting(query, sort_by: str, sort_order: str, search: Optional[str] = None):
+        """ Сортировка по релевантности возможна только вместе с поиском """
+        if sort_by == 'relevance':
+            if ProductSearch.has_terms(search):
+                rank = ProductSearch.rank(ProductSearch.dialect_of(query), search)
+                return query.order_by(desc(rank), desc(Product.id))
+            sort_by = 'created_at'
+
+        ''' Определяем поле для сортировки '''
+        sort_field = SORT_FIELDS.get(sort_by, SORT_FIELDS['created_at'])[0]
+
+        ''' Применяем сортировку (id - для стабильного порядка при равных значениях) '''
         if sort_order == 'desc':
-            query = query.order_by(desc(sort_field))
+            query = query.order_by(desc(sort_field), desc(Product.id))
         else:
-            query = query.order_by(asc(sort_field))
+            query = query.order_by(asc(sort_field), asc(Product.id))
         return query
 
 
@@ -182,14 +404,22 @@ class ProductService:
                 for image_path in db_product.additional_images:
                     FileService.delete_file(image_path)
             db_product.additional_images = additional_images
+        catalog_cache.bump(db)
         db.commit()
-        db.refresh(db_product)
         return db_product
 
 
-    ''' Получение данных для фильтров (уникальные значения) '''
+    ''' Получение данных для фильтров (кешируется до следующего изменения каталога) '''
     @staticmethod
     def get_product_filters_data(db: Session) -> dict:
+        return catalog_cache.get_or_compute(
+            db, 'product_filters_data', lambda: ProductService._load_product_filters_data(db)
+        )
+
+
+    ''' Получение данных для фильтров (уникальные значения) '''
+    @staticmethod
+    def _load_product_filters_data(db: Session) -> dict:
         """ Получаем уникальные производители """
         manufacturers = db.query(Product.manufacturer).distinct().all()
         manufacturers = [m[0] for m in manufacturers if m[0]]
@@ -209,24 +439,143 @@ class ProductService:
             "series": sorted(series),
             "price_min": float(price_range[0]) if price_range[0] else 0,
             "price_max": float(price_range[1]) if price_range[1] else 0,
-            "grades": [grade.value for grade in Product.grade.type.enums]
+            "grades": [grade.value for grade in GradeEnum]
         }
 
 
-    ''' Получение рекомендуемых товаров (по рейтингу и популярности) '''
+    ''' Фасеты каталога для текущего фильтра одним запросом '''
+    @staticmethod
+    def get_facets(db: Session, filters: CatalogFilter) -> dict:
+        dialect_name = db.get_bind().dialect.name
+        conditions = ProductService.catalog_conditions(filters, dialect_name)
+        where = and_(*conditions) if conditions else true()
+
+        if dialect_name == 'postgresql':
+            rows = ProductService._facet_rows_grouping_sets(db, where)
+        else:
+            rows = ProductService._facet_rows_union(db, where)
+
+        facets = {'grade': {}, 'manufacturer': {}, 'series': {}}
+        total, price_min, price_max = 0, None, None
+        for facet, value, count, row_min, row_max in rows:
+            if facet == 'total':
+                total, price_min, price_max = count, row_min, row_max
+            elif value:
+                facets[facet][value] = count
+
+        return ProductService.format_facets(
+            total=total,
+            grades=facets['grade'],
+            manufacturers=facets['manufacturer'],
+            series=facets['series'],
+            price_min=price_min,
+            price_max=price_max
+        )
+
+
+    ''' PostgreSQL: один проход по таблице через GROUPING SETS '''
+    @staticmethod
+    def _facet_rows_grouping_sets(db: Session, where) -> list:
+        grade = cast(Product.grade, String)
+        grouping = func.grouping(grade, Product.manufacturer, Product.series)
+        facet = case(
+            (grouping == 3, 'grade'),
+            (grouping == 5, 'manufacturer'),
+            (grouping == 6, 'series'),
+            else_='total'
+        )
+        value = func.coalesce(grade, Product.manufacturer, Product.series)
+
+        return db.query(facet, value, func.count(), func.min(Product.price), func.max(Product.price)) \
+            .filter(where) \
+            .group_by(func.grouping_sets(tuple_(grade), tuple_(Product.manufacturer), tuple_(Product.series), tuple_())) \
+            .all()
+
+
+    ''' Остальные СУБД: те же группы через UNION ALL (один запрос к БД) '''
+    @staticmethod
+    def _facet_rows_union(db: Session, where) -> list:
+        price_min, price_max = func.min(Product.price), func.max(Product.price)
+
+        def grouped(facet: str, column):
+            value = cast(column, String)
+            return select(literal(facet), value, func.count(), price_min, price_max) \
+                .where(where) \
+                .group_by(value)
+
+        total = select(literal('total'), null(), func.count(), price_min, price_max).where(where)
+        statement = union_all(
+            grouped('grade', Product.grade),
+            grouped('manufacturer', Product.manufacturer),
+            grouped('series', Product.series),
+            total
+        )
+        return db.execute(statement).all()
+
+
+    ''' Единый формат ответа фасетов (из БД и из снимка каталога) '''
+    @staticmethod
+    def format_facets(total: int, grades: dict, manufacturers: dict, series: dict, price_min, price_max) -> dict:
+        def ordered(counts: dict) -> List[dict]:
+            return [{"value": value, "count": count} for value, count in sorted(counts.items())]
+
+        return {
+            "total": total,
+            "grades": [
+                {"value": grade.value, "count": grades.get(grade.value, 0)}
+                for grade in GradeEnum
+            ],
+            "manufacturers": ordered(manufacturers),
+            "series": ordered(series),
+            "price_range": {
+                "min": float(price_min) if price_min is not None else 0,
+                "max": float(price_max) if price_max is not None else 0
+            }
+        }
+
+
+    ''' Получение рекомендуемых товаров (готовый топ, пересчитывается только при изменении каталога) '''
+    @staticmethod
+    def get_featured_products(db: Session, limit: int = 8) -> List[dict]:
+        items = catalog_cache.get_or_compute(
+            db, 'featured_products',
+            lambda: ProductSerializer.to_items(
+                ProductService._query_featured_products(db, settings.PRODUCT_TOP_LIST_SIZE)
+            )
+        )
+        return items[:limit]
+
+
+    ''' Получение новых товаров (готовый топ, пересчитывается только при изменении каталога) '''
+    @staticmethod
+    def get_latest_products(db: Session, limit: int = 8) -> List[dict]:
+        items = catalog_cache.get_or_compute(
+            db, 'latest_products',
+            lambda: ProductSerializer.to_items(
+                ProductService._query_latest_products(db, settings.PRODUCT_TOP_LIST_SIZE)
+            )
+        )
+        return items[:limit]
+
+
+    ''' Топ товаров по рейтингу и популярности (в наличии) '''
     @staticmethod
-    def get_featured_products(db: Session, limit: int = 8) -> list[Type[Product]]:
-        return db.query(Product) \
+    def _query_featured_products(db: Session, limit: int) -> list[Row]:
+        return db.query(*LIST_COLUMNS) \
             .filter(Product.in_stock > 0) \
-            .order_by(desc(Product.average_rating), desc(Product.total_reviews)) \
+            .order_by(
+                desc(func.coalesce(Product.average_rating, 0)),
+                desc(func.coalesce(Product.total_reviews, 0)),
+                desc(Product.id)
+            ) \
             .limit(limit) \
             .all()
 
 
-    ''' Получение новых товаров '''
+    ''' Последние добавленные товары '''
     @staticmethod
-    def get_latest_products(db: Session, limit: int = 8) -> list[Type[Product]]:
-        return db.query(Product) \
-            .order_by(desc(Product.created_at)) \
+    def _query_latest_products(db: Session, limit: int) -> list[Row]:
+        return db.query(*LIST_COLUMNS) \
+            .order_by(desc(Product.created_at), desc(Product.id)) \
             .limit(limit) \
             .all()
\ No newline at end of file
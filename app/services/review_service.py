@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, case, select
+from sqlalchemy.orm import selectinload
 from typing import List, Optional, Type
 from fastapi import HTTPException, UploadFile
 import uuid
@@ -9,22 +10,34 @@ import aiofiles
 
 from app.models import Product, Review, ReviewHelpful
 from app.schemas.review import ReviewCreate, ReviewUpdate, ReviewStats
+from app.services.catalog_cache import catalog_cache
+
+
+''' Связи, которые читает схема ответа Review: в AsyncSession их нельзя догрузить лениво.
+    Опции строятся при вызове, а не при импорте: иначе импорт модуля конфигурирует все мапперы '''
+def review_relations() -> tuple:
+    return selectinload(Review.user), selectinload(Review.product)
 
 
 class ReviewService:
 
+    @staticmethod
+    async def _get_review(db: AsyncSession, review_id: uuid.UUID) -> Optional[Review]:
+        """ Отзыв с автором и товаром """
+        return await db.get(Review, review_id, options=review_relations(), populate_existing=True)
+
     @staticmethod
     async def create_review(
-            db: Session,
+            db: AsyncSession,
             review_data: 'ReviewCreate',
             user_id: uuid.UUID
     ) -> Review:
         """ Создание нового отзыва """
 
         # Проверяем, не оставлял ли пользователь уже отзыв на этот товар
-        existing_review = db.query(Review).filter(
-            and_(Review.user_id == user_id, Review.product_id == review_data.product_id)
-        ).first()
+        existing_review = await db.scalar(
+            select(Review).where(and_(Review.user_id == user_id, Review.product_id == review_data.product_id))
+        )
 
         if existing_review:
             raise HTTPException(
@@ -33,7 +46,7 @@ class ReviewService:
             )
 
         ''' Проверяем существование товара '''
-        product = db.query(Product).filter(and_(review_data.product_id == Product.id)).first()
+        product = await db.get(Product, review_data.product_id)
 
         if not product:
             raise HTTPException(status_code=404, detail='Товар не найден')
@@ -46,17 +59,16 @@ class ReviewService:
         )
 
         db.add(review)
-        db.commit()
-        db.refresh(review)
+        await db.commit()
 
         ''' Обновляем рейтинг товара '''
         await ReviewService.update_product_rating(db, review_data.product_id)
 
-        return review
+        return await ReviewService._get_review(db, review.id)
 
     @staticmethod
     async def get_reviews(
-            db: Session,
+            db: AsyncSession,
             product_id: Optional[uuid.UUID] = None,
             user_id: Optional[uuid.UUID] = None,
             skip: int = 0,
@@ -66,56 +78,62 @@ class ReviewService:
     ) -> tuple[int, list[Type[Review]]]:
         """Получение списка отзывов с фильтрами"""
 
-        query = db.query(Review)
+        query = select(Review)
 
         ''' Фильтры '''
         if product_id:
-            query = query.filter(product_id == Review.product_id)
+            query = query.where(product_id == Review.product_id)
 
         if user_id:
-            query = query.filter(user_id == Review.user_id)
+            query = query.where(user_id == Review.user_id)
 
         if rating_filter:
-            query = query.filter(rating_filter == Review.rating)
+            query = query.where(rating_filter == Review.rating)
 
         if only_approved:
-            query = query.filter(and_(Review.is_approved == True, Review.is_hidden == False))
+            query = query.where(and_(Review.is_approved == True, Review.is_hidden == False))
 
         ''' Подсчет общего количества '''
-        total = query.count()
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
 
         ''' Получение отзывов с пагинацией '''
-        reviews = query.order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+        reviews = (await db.scalars(
+            query.options(*review_relations()).order_by(Review.created_at.desc()).offset(skip).limit(limit)
+        )).all()
 
         return total, reviews
 
     @staticmethod
     async def get_review_by_id(
-            db: Session,
+            db: AsyncSession,
             review_id: uuid.UUID,
             current_user_id: Optional[uuid.UUID] = None
     ) -> Type[Review]:
         """ Получение отзыва по ID с дополнительной информацией """
 
-        review = db.query(Review).filter(review_id == Review.id).first()
+        review = await ReviewService._get_review(db, review_id)
         if not review:
             raise HTTPException(status_code=404, detail='Отзыв не найден')
 
         ''' Добавляем информацию о голосах за полезность '''
         if current_user_id:
-            helpful_vote = db.query(ReviewHelpful).filter(
-                and_(
-                    ReviewHelpful.review_id == review_id,
-                    ReviewHelpful.user_id == current_user_id
+            helpful_vote = await db.scalar(
+                select(ReviewHelpful).where(
+                    and_(
+                        ReviewHelpful.review_id == review_id,
+                        ReviewHelpful.user_id == current_user_id
+                    )
                 )
-            ).first()
+            )
             review.user_helpful_vote = helpful_vote.is_helpful if helpful_vote else None
 
         ''' Подсчитываем голоса за полезность '''
-        helpful_stats = db.query(
-            func.sum(func.case([(ReviewHelpful.is_helpful == True, 1)], else_=0)).label('helpful'),
-            func.sum(func.case([(ReviewHelpful.is_helpful == False, 1)], else_=0)).label('not_helpful')
-        ).filter(review_id == ReviewHelpful.review_id).first()
+        helpful_stats = (await db.execute(
+            select(
+                func.sum(case((ReviewHelpful.is_helpful == True, 1), else_=0)).label('helpful'),
+                func.sum(case((ReviewHelpful.is_helpful == False, 1), else_=0)).label('not_helpful')
+            ).where(review_id == ReviewHelpful.review_id)
+        )).first()
 
         review.helpful_count = helpful_stats.helpful or 0
         review.not_helpful_count = helpful_stats.not_helpful or 0
@@ -124,7 +142,7 @@ class ReviewService:
 
     @staticmethod
     async def update_review(
-            db: Session,
+            db: AsyncSession,
             review_id: uuid.UUID,
             review_data: 'ReviewUpdate',
             user_id: uuid.UUID,
@@ -132,7 +150,7 @@ class ReviewService:
     ) -> Type[Review]:
         """ Обновление отзыва """
 
-        review = db.query(Review).filter(review_id == Review.id).first()
+        review = await ReviewService._get_review(db, review_id)
         if not review:
             raise HTTPException(status_code=404, detail='Отзыв не найден')
 
@@ -153,8 +171,7 @@ class ReviewService:
         for field, value in update_data.items():
             setattr(review, field, value)
 
-        db.commit()
-        db.refresh(review)
+        await db.commit()
 
         ''' Обновляем рейтинг товара если изменился rating '''
         if 'rating' in update_data:
@@ -164,14 +181,14 @@ class ReviewService:
 
     @staticmethod
     async def delete_review(
-            db: Session,
+            db: AsyncSession,
             review_id: uuid.UUID,
             user_id: uuid.UUID,
             is_admin: bool = False
     ) -> bool:
         """ Удаление отзыва """
 
-        review = db.query(Review).filter(review_id == Review.id).first()
+        review = await db.get(Review, review_id)
         if not review:
             raise HTTPException(status_code=404, detail='Отзыв не найден')
 
@@ -193,8 +210,8 @@ class ReviewService:
                 except Exception:
                     pass
 
-        db.delete(review)
-        db.commit()
+        await db.delete(review)
+        await db.commit()
 
         ''' Обновляем рейтинг товара '''
         await ReviewService.update_product_rating(db, product_id)
@@ -203,14 +220,14 @@ class ReviewService:
 
     @staticmethod
     async def add_review_images(
-            db: Session,
+            db: AsyncSession,
             review_id: uuid.UUID,
             images: List[UploadFile],
             user_id: uuid.UUID
     ) -> Type[Review]:
         """ Добавление изображений к отзыву """
 
-        review = db.query(Review).filter(review_id == Review.id).first()
+        review = await ReviewService._get_review(db, review_id)
         if not review:
             raise HTTPException(status_code=404, detail='Отзыв не найден')
 
@@ -276,14 +293,13 @@ class ReviewService:
 
         ''' Обновляем список изображений в отзыве '''
         review.images = current_images + new_images
-        db.commit()
-        db.refresh(review)
+        await db.commit()
 
         return review
 
     @staticmethod
     async def vote_helpful(
-            db: Session,
+            db: AsyncSession,
             review_id: uuid.UUID,
             user_id: uuid.UUID,
             is_helpful: bool
@@ -291,23 +307,24 @@ class ReviewService:
         """ Голосование за полезность отзыва """
 
         ''' Проверяем существование отзыва '''
-        review = db.query(Review).filter(review_id == Review.id).first()
+        review = await db.get(Review, review_id)
         if not review:
             raise HTTPException(status_code=404, detail='Отзыв не найден')
 
         # Проверяем, не голосовал ли пользователь уже
-        existing_vote = db.query(ReviewHelpful).filter(
-            and_(
-                ReviewHelpful.review_id == review_id,
-                ReviewHelpful.user_id == user_id
+        existing_vote = await db.scalar(
+            select(ReviewHelpful).where(
+                and_(
+                    ReviewHelpful.review_id == review_id,
+                    ReviewHelpful.user_id == user_id
+                )
             )
-        ).first()
+        )
 
         if existing_vote:
             ''' Обновляем существующий голос '''
             existing_vote.is_helpful = is_helpful
-            db.commit()
-            db.refresh(existing_vote)
+            await db.commit()
             return existing_vote
         else:
             ''' Создаем новый голос '''
@@ -317,25 +334,26 @@ class ReviewService:
                 is_helpful=is_helpful
             )
             db.add(vote)
-            db.commit()
-            db.refresh(vote)
+            await db.commit()
             return vote
 
     @staticmethod
-    async def get_review_stats(db: Session, product_id: uuid.UUID) -> ReviewStats:
+    async def get_review_stats(db: AsyncSession, product_id: uuid.UUID) -> ReviewStats:
         """ Получение статистики отзывов для товара """
 
         ''' Получаем все одобренные отзывы товара '''
-        reviews = db.query(ReviewStats).filter(
-            and_(
-                Review.product_id == product_id,
-                Review.is_approved == True,
-                Review.is_hidden == False
+        reviews = (await db.scalars(
+            select(Review).where(
+                and_(
+                    Review.product_id == product_id,
+                    Review.is_approved == True,
+                    Review.is_hidden == False
+                )
             )
-        ).all()
+        )).all()
 
         if not reviews:
-            return Review.ReviewStats(
+            return ReviewStats(
                 total_reviews=0,
                 average_rating=0.0,
                 rating_distribution={1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
@@ -351,21 +369,22 @@ class ReviewService:
         for review in reviews:
             rating_distribution[review.rating] += 1
 
-        return review_schemas.ReviewStats(
+        return ReviewStats(
             total_reviews=total_reviews,
             average_rating=average_rating,
             rating_distribution=rating_distribution
         )
 
     @staticmethod
-    async def update_product_rating(db: Session, product_id: uuid.UUID):
+    async def update_product_rating(db: AsyncSession, product_id: uuid.UUID):
         """ Обновление рейтинга товара """
 
         stats = await ReviewService.get_review_stats(db, product_id)
 
         ''' Обновляем поля в товаре '''
-        product = db.query(Product).filter(product_id == Product.id).first()
+        product = await db.get(Product, product_id)
         if product:
             product.average_rating = stats.average_rating
             product.total_reviews = stats.total_reviews
-            db.commit()
\ No newline at end of file
+            await db.run_sync(catalog_cache.bump)
+            await db.commit()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import re
+from typing import List
+from sqlalchemy import or_, and_, func, case, literal, true
+from sqlalchemy.sql.elements import ColumnElement
+from app.models import Product
+
+
+''' Конфигурация полнотекстового поиска (должна совпадать с выражением колонки Product.search_vector) '''
+TS_CONFIG = 'simple'
+
+''' Сгенерированная колонка tsvector с GIN-индексом '''
+SEARCH_VECTOR = Product.__table__.c.search_vector
+
+
+class ProductSearch:
+    """Поиск товаров: tsvector + pg_trgm в PostgreSQL; поиск по словам - для диалектов без tsvector
+    (схема моделей рассчитана на PostgreSQL: UUID, серверные функции, поэтому в SQLite она не создается)"""
+
+    ''' Поддерживает ли соединение индексный поиск '''
+    @staticmethod
+    def is_indexed(dialect_name: str) -> bool:
+        return dialect_name == 'postgresql'
+
+
+    ''' Диалект, на котором будет выполнен запрос '''
+    @staticmethod
+    def dialect_of(query) -> str:
+        return query.session.get_bind().dialect.name
+
+
+    ''' Разбиваем поисковую строку на слова '''
+    @staticmethod
+    def tokenize(term: str) -> List[str]:
+        return [token for token in re.split(r'\s+', term.lower().strip()) if token]
+
+
+    ''' Есть ли что искать (строка из одних пробелов поиском не считается) '''
+    @staticmethod
+    def has_terms(term: str) -> bool:
+        return bool(term) and bool(ProductSearch.tokenize(term))
+
+
+    ''' Экранирование спецсимволов LIKE '''
+    @staticmethod
+    def _like_pattern(term: str) -> str:
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'%{escaped}%'
+
+
+    ''' Условие поиска для WHERE '''
+    @staticmethod
+    def condition(dialect_name: str, term: str) -> ColumnElement:
+        term = term.strip()
+        if not ProductSearch.has_terms(term):
+            return true()
+
+        if ProductSearch.is_indexed(dialect_name):
+            ts_query = func.websearch_to_tsquery(TS_CONFIG, term)
+            return or_(
+                SEARCH_VECTOR.op('@@')(ts_query),
+                Product.name.ilike(ProductSearch._like_pattern(term), escape='\\'),  # gin_trgm_ops
+                literal(term, Product.name.type).op('<%')(Product.name)  # word_similarity, опечатки
+            )
+
+        ''' Fallback: каждое слово должно встретиться в названии, серии или описании '''
+        return and_(*[
+            or_(
+                func.lower(Product.name).contains(token, autoescape=True),
+                func.lower(Product.series).contains(token, autoescape=True),
+                func.lower(Product.description).contains(token, autoescape=True)
+            )
+            for token in ProductSearch.tokenize(term)
+        ])
+
+
+    ''' Выражение релевантности для сортировки (больше - лучше) '''
+    @staticmethod
+    def rank(dialect_name: str, term: str) -> ColumnElement:
+        term = term.strip()
+
+        if ProductSearch.is_indexed(dialect_name):
+            ts_query = func.websearch_to_tsquery(TS_CONFIG, term)
+            return func.ts_rank_cd(SEARCH_VECTOR, ts_query) + func.word_similarity(term, Product.name)
+
+        ''' Fallback: совпадение названия важнее совпадения серии и описания '''
+        name = func.lower(Product.name)
+        lowered = term.lower()
+        return case(
+            (name == lowered, 4),
+            (name.startswith(lowered, autoescape=True), 3),
+            (name.contains(lowered, autoescape=True), 2),
+            (func.lower(Product.series).contains(lowered, autoescape=True), 1),
+            else_=0
+        )
+
+
+    ''' Применение поиска к запросу товаров '''
+    @staticmethod
+    def apply(query, term: str):
+        if not ProductSearch.has_terms(term):
+            return query
+        return query.filter(ProductSearch.condition(ProductSearch.dialect_of(query), term))
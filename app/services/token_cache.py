@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+from app.schemas.user import TokenData
+
+
+TOKEN_CACHE_REQUESTS = Counter(
+    'token_cache_requests_total',
+    'Обращения к кешу декодированных JWT',
+    ['result']  # hit | miss
+)
+
+
+class DecodedTokenCache:
+    """LRU кеш проверенных токенов: повторный запрос с тем же токеном не декодирует JWT заново.
+       Ключ - хеш токена (сам токен в памяти не хранится), запись живет до exp токена"""
+
+    def __init__(self):
+        self._entries: 'OrderedDict[bytes, Tuple[float, TokenData]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+    ''' Утверждения ранее проверенного токена (None - нет в кеше или истек) '''
+    def get(self, token: str) -> Optional[TokenData]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+            elif entry is not None:
+                del self._entries[key]
+                entry = None
+
+        TOKEN_CACHE_REQUESTS.labels(result='hit' if entry is not None else 'miss').inc()
+        return entry[1] if entry is not None else None
+
+
+    ''' Запомнить утверждения проверенного токена (только действительные токены) '''
+    def put(self, token: str, claims: TokenData):
+        if settings.TOKEN_CACHE_MAX_SIZE <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims.expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = DecodedTokenCache()
+
+TOKEN_CACHE_SIZE = Gauge('token_cache_entries', 'Записей в кеше декодированных JWT')
+TOKEN_CACHE_SIZE.set_function(lambda: len(token_cache))
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import TokenRevocation, User
+from app.schemas.user import TokenData
+
+
+logger = logging.getLogger(__name__)
+
+_PENDING = 'token_revocations_pending'
+
+''' Изменение этих полей делает утверждения уже выданных токенов пользователя неверными '''
+_CLAIM_FIELDS = ('email', 'is_admin', 'is_active', 'password_hash')
+
+
+def _to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+class RevocationList:
+    """Отозванные токены в памяти процесса; источник правды - таблица token_revocations"""
+
+    def __init__(self):
+        self._tokens: Dict[str, float] = {}  # jti -> когда запись можно забыть
+        self._users: Dict[uuid.UUID, int] = {}  # user_id -> время отзыва (мс): токены, выданные раньше, отозваны
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+
+    ''' Отозван ли токен (только память, без запросов к БД) '''
+    def is_revoked(self, claims: TokenData) -> bool:
+        if claims.jti in self._tokens:
+            return True
+        revoked_at = self._users.get(claims.user_id)
+        return revoked_at is not None and claims.issued_at_ms < revoked_at
+
+
+    ''' Отзыв одного токена (выход из системы); применяется в памяти после commit '''
+    @staticmethod
+    def revoke_token(db: Session, claims: TokenData):
+        db.add(TokenRevocation(
+            jti=claims.jti,
+            revoked_at=datetime.now(timezone.utc),
+            expires_at=datetime.fromtimestamp(claims.expires_at, timezone.utc)
+        ))
+
+
+    ''' Отзыв всех выданных пользователю токенов; применяется в памяти после commit '''
+    @staticmethod
+    def revoke_user(db: Session, user_id: uuid.UUID):
+        now = datetime.now(timezone.utc)
+        db.add(TokenRevocation(
+            user_id=user_id,
+            revoked_at=now,
+            expires_at=now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        ))
+
+
+    def _apply(self, revocations: List[TokenRevocation]):
+        with self._lock:
+            for revocation in revocations:
+                if revocation.jti:
+                    self._tokens[revocation.jti] = revocation.expires_at.timestamp()
+                if revocation.user_id:
+                    revoked_at = _to_ms(revocation.revoked_at)
+                    self._users[revocation.user_id] = max(self._users.get(revocation.user_id, 0), revoked_at)
+
+
+    ''' Полная синхронизация с БД: действующие записи, устаревшие удаляются '''
+    def sync(self, db: Session):
+        now = datetime.now(timezone.utc)
+        revocations = db.query(TokenRevocation).filter(TokenRevocation.expires_at > now).all()
+        db.query(TokenRevocation).filter(TokenRevocation.expires_at <= now).delete(synchronize_session=False)
+        db.commit()
+
+        tokens = {r.jti: r.expires_at.timestamp() for r in revocations if r.jti}
+        users: Dict[uuid.UUID, int] = {}
+        for r in revocations:
+            if r.user_id:
+                users[r.user_id] = max(users.get(r.user_id, 0), _to_ms(r.revoked_at))
+        with self._lock:
+            self._tokens, self._users = tokens, users
+
+
+    def __len__(self):
+        return len(self._tokens) + len(self._users)
+
+
+    async def _run(self):
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(self.sync)
+            except Exception:
+                ''' Любая ошибка (в т.ч. драйвера или сети) не должна останавливать синхронизацию до перезапуска '''
+                logger.exception('Не удалось синхронизировать отозванные токены')
+            await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS)
+
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_list = RevocationList()
+
+
+''' Блокировка, смена прав, почты или пароля отзывают уже выданные токены пользователя
+    (в той же транзакции, что и само изменение) '''
+@event.listens_for(Session, 'before_flush')
+def _before_flush(session: Session, flush_context, instances):
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[field].history.has_changes() for field in _CLAIM_FIELDS):
+            RevocationList.revoke_user(session, obj.id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session: Session, flush_context):
+    pending = [obj for obj in session.new if isinstance(obj, TokenRevocation)]
+    if pending:
+        session.info.setdefault(_PENDING, []).extend(pending)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session):
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        revocation_list._apply(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session):
+    session.info.pop(_PENDING, None)
+
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+
+''' Методы, которые можно отдавать с реплики '''
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+''' Кука "недавно писал": пока она жива, чтения клиента идут на primary '''
+STICKY_COOKIE = 'db_primary'
+
+class RecentWriters:
+    """Клиенты без кук (Bearer-токены), недавно писавшие в БД: LRU хеш заголовка Authorization -> момент,
+       до которого их чтения идут на primary. Сам токен в памяти не хранится.
+       Ограничение: запись помнит только этот процесс - при нескольких воркерах следующий GET клиента
+       может попасть в другой воркер и прочитать с реплики (для браузеров то же гарантирует кука)"""
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: 'OrderedDict[bytes, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def key(headers) -> Optional[bytes]:
+        authorization = headers.get('authorization')
+        if not authorization:
+            return None
+        return hashlib.blake2b(authorization.encode('latin-1'), digest_size=16).digest()
+
+
+    def is_recent(self, key: bytes) -> bool:
+        with self._lock:
+            until = self._entries.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+
+    ''' Запомнить запись клиента на DATABASE_REPLICA_STICKY_SECONDS; при переполнении вытесняется
+        давно писавший клиент, а не все сразу '''
+    def remember(self, key: bytes):
+        with self._lock:
+            self._entries[key] = time.monotonic() + settings.DATABASE_REPLICA_STICKY_SECONDS
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+recent_writers = RecentWriters(max_size=10000)
+
+
+''' Нужно ли читать с primary: запись или недавняя запись этого клиента (read-your-writes) '''
+def prefers_primary(request: Request) -> bool:
+    if request.method not in SAFE_METHODS:
+        return True
+    if STICKY_COOKIE in request.cookies:
+        return True
+
+    key = RecentWriters.key(request.headers)
+    return key is not None and recent_writers.is_recent(key)
+
+
+class PrimaryStickinessMiddleware:
+    """После запроса на запись ставит куку и запоминает клиента, чтобы его следующие чтения шли на primary"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS or not settings.DATABASE_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        key = RecentWriters.key(Request(scope).headers)
+        if key is not None:
+            recent_writers.remember(key)
+
+        async def send_with_cookie(message: Message):
+            if message['type'] == 'http.response.start':
+                cookie = SimpleCookie()
+                cookie[STICKY_COOKIE] = '1'
+                cookie[STICKY_COOKIE]['max-age'] = settings.DATABASE_REPLICA_STICKY_SECONDS
+                cookie[STICKY_COOKIE]['path'] = '/'
+                cookie[STICKY_COOKIE]['httponly'] = True
+                cookie[STICKY_COOKIE]['samesite'] = 'lax'
+                headers = list(message.get('headers', []))
+                headers.append((b'set-cookie', cookie.output(header='').strip().encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -4,28 +4,78 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app.database import get_db
 from app.services.auth_service import AuthService
+from app.services.principal_cache import principal_cache
+from app.services.token_revocation import revocation_list
 from app.models.user import User
+from app.schemas.user import TokenData
 from app.utils.exceptions import AuthException
 
 # Схема безопасности для Bearer токенов
 security = HTTPBearer()
 
 
+''' Пользователь по subject токена: сначала кеш процесса, при промахе - БД '''
+def _load_principal(db: Session, email: str) -> Optional[User]:
+    user = principal_cache.get(db, email)
+    if user is None:
+        user = AuthService.get_user_by_email(db, email=email)
+        if user is not None:
+            principal_cache.put(email, user)
+    return user
+
+
+''' Подписанные утверждения неотозванного токена (None - токен недействителен) '''
+def _decode_principal(token: str) -> Optional[TokenData]:
+    claims = AuthService.decode_claims(token)
+    if claims is None or revocation_list.is_revoked(claims):
+        return None
+    return claims
+
+
+async def get_token_principal(
+        credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenData:
+    """
+    Зависимость для авторизации по утверждениям токена, без обращения к БД
+    (для обработчиков, которым достаточно id пользователя и роли)
+    """
+    principal = _decode_principal(credentials.credentials)
+    if principal is None:
+        raise AuthException.INVALID_TOKEN
+    return principal
+
+
+async def get_active_principal(
+        principal: TokenData = Depends(get_token_principal)
+) -> TokenData:
+    """
+    Зависимость для активного пользователя по утверждениям токена
+    """
+    if not principal.is_active:
+        raise AuthException.INACTIVE_USER
+    return principal
+
+
+async def get_admin_principal(
+        principal: TokenData = Depends(get_active_principal)
+) -> TokenData:
+    """
+    Зависимость для администратора по утверждениям токена
+    """
+    if not principal.is_admin:
+        raise AuthException.PERMISSION_DENIED
+    return principal
+
+
 async def get_current_user(
-        credentials: HTTPAuthorizationCredentials = Depends(security),
+        principal: TokenData = Depends(get_token_principal),
         db: Session = Depends(get_db)
 ) -> User:
     """
-    Зависимость для получения текущего авторизованного пользователя
+    Зависимость для получения текущего авторизованного пользователя (загружает строку users)
     """
-    token = credentials.credentials
-    email = AuthService.verify_token(token)
-
-    if email is None:
-        raise AuthException.INVALID_TOKEN
-
-    user = AuthService.get_user_by_email(db, email=email)
-    if user is None:
+    user = _load_principal(db, principal.email)
+    if user is None or user.id != principal.user_id:
         raise AuthException.INVALID_TOKEN
 
     return user
@@ -64,11 +114,9 @@ async def get_current_user_optional(
     if credentials is None:
         return None
 
-    token = credentials.credentials
-    email = AuthService.verify_token(token)
-
-    if email is None:
+    principal = _decode_principal(credentials.credentials)
+    if principal is None:
         return None
 
-    user = AuthService.get_user_by_email(db, email=email)
+    user = _load_principal(db, principal.email)
     return user if user and user.is_active else None
\ No newline at end of file
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+''' Сильный ETag из частей ключа (id, updated_at, версия каталога, параметры запроса) '''
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+''' Совпадает ли ETag с заголовком If-None-Match (для GET сравнение слабое, RFC 9110) '''
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+''' Ставит ETag и Cache-Control; возвращает готовый 304, если у клиента актуальная версия '''
+def conditional_response(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    headers = {'ETag': etag}
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException, Request, status
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+
+
+LOGIN_ATTEMPTS_TOTAL = Counter('login_attempts_total', 'Попытки входа', ['result'])  # success | failure | throttled
+LOGIN_THROTTLED_TOTAL = Counter('login_throttled_total', 'Попытки входа, отклоненные до проверки пароля', ['scope'])
+LOGIN_THROTTLE_KEYS = Gauge('login_throttle_tracked_keys', 'Отслеживаемых ключей ограничителя входа', ['scope'])
+LOGIN_THROTTLE_BLOCKED = Gauge('login_throttle_blocked_keys', 'Ключей, для которых вход сейчас запрещен', ['scope'])
+
+
+class SlidingWindowLimiter:
+    """Скользящее окно по ключу (приближение двумя соседними окнами), счетчики разбиты на шарды с отдельными блокировками"""
+
+    def __init__(self, limit: int, window: float, shards: int, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self._max_keys_per_shard = max(1, max_keys // shards)
+        ''' Шард: блокировка + {ключ: [начало окна, счетчик окна, счетчик предыдущего окна]} '''
+        self._shards: List[Tuple[threading.Lock, Dict[str, list]]] = [(threading.Lock(), {}) for _ in range(shards)]
+
+
+    def _shard(self, key: str) -> Tuple[threading.Lock, Dict[str, list]]:
+        return self._shards[hash(key) % len(self._shards)]
+
+
+    ''' Сдвигает окно ключа к текущему времени '''
+    def _roll(self, entry: list, now: float):
+        elapsed = now - entry[0]
+        if elapsed >= 2 * self.window:
+            entry[:] = [now - (elapsed % self.window), 0, 0]
+        elif elapsed >= self.window:
+            entry[:] = [entry[0] + self.window, 0, entry[1]]
+
+
+    def _estimate(self, entry: list, now: float) -> float:
+        weight = 1 - (now - entry[0]) / self.window
+        return entry[2] * weight + entry[1]
+
+
+    ''' Сколько секунд ждать, пока ключ, упершийся в лимит, снова сможет сделать попытку '''
+    def _retry_after(self, entry: list, now: float) -> float:
+        window_end = entry[0] + self.window
+        if entry[1] >= self.limit or entry[2] == 0:
+            return window_end - now
+        ''' Ждем, пока вклад предыдущего окна не опустится ниже остатка лимита '''
+        share = 1 - (self.limit - entry[1]) / entry[2]
+        return max(entry[0] + share * self.window - now, 0.001)
+
+
+    ''' Проверить лимит и учесть попытку одним шагом под блокировкой шарда: параллельные запросы
+        не проходят проверку все вместе до того, как кто-то из них учтен.
+        Возвращает 0, если попытка разрешена (и учтена), иначе - сколько секунд ждать '''
+    def acquire(self, key: str) -> float:
+        now = time.monotonic()
+        lock, entries = self._shard(key)
+        with lock:
+            entry = entries.get(key)
+            if entry is None:
+                if len(entries) >= self._max_keys_per_shard:
+                    self._evict(entries, now)
+                entry = entries[key] = [now, 0, 0]
+            else:
+                self._roll(entry, now)
+                if self._estimate(entry, now) >= self.limit:
+                    return self._retry_after(entry, now)
+            entry[1] += 1
+            return 0.0
+
+
+    ''' Вернуть учтенную попытку (она оказалась успешной) '''
+    def release(self, key: str):
+        now = time.monotonic()
+        lock, entries = self._shard(key)
+        with lock:
+            entry = entries.get(key)
+            if entry is None:
+                return
+            self._roll(entry, now)
+            if entry[1]:
+                entry[1] -= 1
+            elif entry[2]:
+                entry[2] -= 1
+
+
+    ''' Забыть ключ (успешный вход) '''
+    def reset(self, key: str):
+        lock, entries = self._shard(key)
+        with lock:
+            entries.pop(key, None)
+
+
+    ''' Шард переполнен: сначала удаляем отжившие ключи, если их нет - самый старый '''
+    def _evict(self, entries: Dict[str, list], now: float):
+        stale = [key for key, entry in entries.items() if now - entry[0] >= 2 * self.window]
+        for key in stale:
+            del entries[key]
+        if not stale:
+            del entries[min(entries, key=lambda key: entries[key][0])]
+
+
+    def __len__(self):
+        return sum(len(entries) for _, entries in self._shards)
+
+
+    ''' Число ключей, упершихся в лимит (для метрик) '''
+    def blocked(self) -> int:
+        now = time.monotonic()
+        count = 0
+        for lock, entries in self._shards:
+            with lock:
+                for entry in entries.values():
+                    if now - entry[0] < 2 * self.window:
+                        self._roll(entry, now)
+                        count += self._estimate(entry, now) >= self.limit
+        return count
+
+
+class LoginThrottle:
+    """Ограничение неудачных входов по IP и по аккаунту: каждая попытка учитывается до bcrypt,
+    успешная - возвращается (по IP) или сбрасывает счетчик (по аккаунту)"""
+
+    def __init__(self):
+        self.by_ip = SlidingWindowLimiter(
+            settings.LOGIN_THROTTLE_IP_LIMIT, settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+            settings.LOGIN_THROTTLE_SHARDS, settings.LOGIN_THROTTLE_MAX_KEYS
+        )
+        self.by_account = SlidingWindowLimiter(
+            settings.LOGIN_THROTTLE_ACCOUNT_LIMIT, settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+            settings.LOGIN_THROTTLE_SHARDS, settings.LOGIN_THROTTLE_MAX_KEYS
+        )
+
+
+    @staticmethod
+    def _reject(scope: str, retry_after: float) -> HTTPException:
+        LOGIN_THROTTLED_TOTAL.labels(scope=scope).inc()
+        LOGIN_ATTEMPTS_TOTAL.labels(result='throttled').inc()
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много попыток входа, повторите позже",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+    ''' Попытка с IP (до открытия сессии БД): 429 сверх лимита, иначе попытка учтена '''
+    def acquire_ip(self, ip: str):
+        retry_after = self.by_ip.acquire(ip)
+        if retry_after:
+            raise self._reject('ip', retry_after)
+
+
+    ''' Попытка входа в аккаунт (до поиска пользователя и проверки пароля): 429 сверх лимита, иначе попытка учтена '''
+    def acquire_account(self, email: str):
+        retry_after = self.by_account.acquire(email.lower())
+        if retry_after:
+            raise self._reject('account', retry_after)
+
+
+    ''' Неудачная попытка уже учтена в acquire_* - только метрика '''
+    def record_failure(self):
+        LOGIN_ATTEMPTS_TOTAL.labels(result='failure').inc()
+
+
+    def record_success(self, ip: str, email: str):
+        LOGIN_ATTEMPTS_TOTAL.labels(result='success').inc()
+        self.by_ip.release(ip)
+        self.by_account.reset(email.lower())
+
+
+login_throttle = LoginThrottle()
+
+LOGIN_THROTTLE_KEYS.labels(scope='ip').set_function(lambda: len(login_throttle.by_ip))
+LOGIN_THROTTLE_KEYS.labels(scope='account').set_function(lambda: len(login_throttle.by_account))
+LOGIN_THROTTLE_BLOCKED.labels(scope='ip').set_function(login_throttle.by_ip.blocked)
+LOGIN_THROTTLE_BLOCKED.labels(scope='account').set_function(login_throttle.by_account.blocked)
+
+
+async def throttle_login_ip(request: Request) -> str:
+    """
+    Зависимость для эндпоинтов входа: учитывает попытку с IP и отклоняет сверх лимита до открытия сессии БД
+    """
+    ip = request.client.host if request.client else 'unknown'
+    login_throttle.acquire_ip(ip)
+    return ip
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from prometheus_client import Counter, Histogram
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+''' Метрики event loop '''
+LOOP_LAG_SECONDS = Histogram(
+    'event_loop_lag_seconds',
+    'Задержка пробуждения контрольной задачи event loop',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKS_TOTAL = Counter(
+    'event_loop_blocks_total',
+    'Количество блокировок event loop дольше порога',
+    ['route']
+)
+LOOP_BLOCK_SECONDS = Histogram(
+    'event_loop_block_seconds',
+    'Длительность блокировок event loop дольше порога',
+    ['route'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+UNKNOWN_ROUTE = 'unknown'
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoopLagMonitor:
+    """Измеряет задержку event loop и находит маршрут, который его заблокировал"""
+
+    def __init__(self):
+        self._app = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+        self._last_beat = time.monotonic()
+        self._current_block: Optional[dict] = None
+        self._blocks: Deque[dict] = deque(maxlen=settings.LOOP_MONITOR_HISTORY_SIZE)
+        self._routes: Dict[str, dict] = {}
+        self._route_codes: Dict[object, str] = {}
+        self._max_lag = 0.0
+
+
+    ''' Запуск: контрольная задача в event loop + сторожевой поток '''
+    def start(self, app):
+        if not settings.LOOP_MONITOR_ENABLED or self._heartbeat_task is not None:
+            return
+
+        self._app = app
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True)
+        self._watchdog.start()
+
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+
+    ''' Контрольная задача: просыпается каждые interval секунд и меряет опоздание '''
+    async def _heartbeat(self):
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag = max(now - started - interval, 0.0)
+
+            LOOP_LAG_SECONDS.observe(lag)
+            with self._lock:
+                self._last_beat = now
+                self._max_lag = max(self._max_lag, lag)
+                if self._current_block is not None:
+                    self._finish_block(lag)
+
+
+    ''' Сторожевой поток: если контрольная задача не просыпается дольше порога - снимаем стек loop '''
+    def _watch(self):
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        threshold = settings.LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS
+        while not self._stopped.wait(interval):
+            with self._lock:
+                stalled = time.monotonic() - self._last_beat
+                if stalled < threshold + interval or self._current_block is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                self._current_block = self._describe(frame)
+
+
+    ''' Маршрут и место блокировки по стеку потока event loop '''
+    def _describe(self, frame) -> dict:
+        route = UNKNOWN_ROUTE
+        site = None
+        stack = traceback.format_stack(frame, limit=settings.LOOP_MONITOR_STACK_DEPTH) if frame else []
+
+        codes = self._endpoint_codes()
+        while frame is not None:
+            if site is None and frame.f_code.co_filename.startswith(APP_DIR):
+                site = f'{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+            if frame.f_code in codes:
+                route = codes[frame.f_code]
+                break
+            frame = frame.f_back
+
+        return {
+            'route': route,
+            'site': site,
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'stack': stack,
+        }
+
+
+    ''' Соответствие кода обработчиков маршрутам (строится лениво, после подключения роутеров) '''
+    def _endpoint_codes(self) -> Dict[object, str]:
+        if not self._route_codes and self._app is not None:
+            for route in self._app.routes:
+                if isinstance(route, APIRoute):
+                    methods = ','.join(sorted(route.methods or []))
+                    self._route_codes[route.endpoint.__code__] = f'{methods} {route.path}'
+        return self._route_codes
+
+
+    ''' Event loop снова отвечает: сохраняем блокировку в метрики и историю '''
+    def _finish_block(self, lag: float):
+        block = self._current_block
+        self._current_block = None
+
+        block['duration_seconds'] = round(lag, 4)
+        route = block['route']
+        LOOP_BLOCKS_TOTAL.labels(route=route).inc()
+        LOOP_BLOCK_SECONDS.labels(route=route).observe(lag)
+
+        stats = self._routes.setdefault(route, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        stats['count'] += 1
+        stats['total_seconds'] += lag
+        stats['max_seconds'] = max(stats['max_seconds'], lag)
+
+        self._blocks.append(block)
+        logger.warning('Event loop заблокирован на %.3f с: %s (%s)', lag, route, block['site'])
+
+
+    ''' Данные для отладочного эндпоинта '''
+    def snapshot(self, limit: int = 20) -> dict:
+        with self._lock:
+            blocks: List[dict] = list(self._blocks)[-limit:]
+            routes = sorted(
+                ({'route': route, **stats} for route, stats in self._routes.items()),
+                key=lambda item: item['total_seconds'],
+                reverse=True
+            )
+            return {
+                'enabled': self._heartbeat_task is not None,
+                'interval_seconds': settings.LOOP_MONITOR_INTERVAL_SECONDS,
+                'threshold_seconds': settings.LOOP_MONITOR_BLOCK_THRESHOLD_SECONDS,
+                'max_lag_seconds': round(self._max_lag, 4),
+                'blocked_now': self._current_block,
+                'routes': routes,
+                'recent_blocks': list(reversed(blocks)),
+            }
+
+
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,58 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+''' Метрики пулов соединений (label pool - имя движка: primary, primary_async, реплики) '''
+POOL_SIZE = Gauge('db_pool_size', 'Постоянных соединений в пуле (pool_size)', ['pool'])
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Соединений выдано приложению', ['pool'])
+POOL_CHECKED_IN = Gauge('db_pool_checked_in', 'Свободных соединений в пуле', ['pool'])
+POOL_OVERFLOW = Gauge('db_pool_overflow', 'Соединений сверх pool_size (отрицательно - пул еще не заполнен)', ['pool'])
+POOL_CHECKOUT_SECONDS = Histogram(
+    'db_pool_checkout_seconds',
+    'Время получения соединения из пула (ожидание + подключение + pre_ping)',
+    ['pool'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    'db_pool_checkout_timeouts_total',
+    'Соединение не получено за pool_timeout',
+    ['pool']
+)
+
+
+class _TimedCheckout:
+    """Замер времени выдачи соединения; имя пула берется из pool_logging_name"""
+
+    def connect(self):
+        name = self._orig_logging_name or 'default'
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(pool=name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(pool=name).observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+''' Живые значения пула на момент сбора метрик (engine.pool читается заново - пул пересоздается при dispose) '''
+def register_pool_gauges(engine: Engine, name: str):
+    if not isinstance(engine.pool, QueuePool):
+        return
+
+    POOL_SIZE.labels(pool=name).set_function(lambda: engine.pool.size())
+    POOL_CHECKED_OUT.labels(pool=name).set_function(lambda: engine.pool.checkedout())
+    POOL_CHECKED_IN.labels(pool=name).set_function(lambda: engine.pool.checkedin())
+    POOL_OVERFLOW.labels(pool=name).set_function(lambda: engine.pool.overflow())
@@ -0,0 +1,142 @@
+import logging
+import random
+import time
+from collections import Counter as ShapeCounter
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('app.sql.slow')
+
+
+''' Метрики SQL на запрос '''
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request',
+    'Количество SQL запросов за HTTP-запрос',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'db_time_per_request_seconds',
+    'Суммарное время SQL запросов за HTTP-запрос',
+    ['route'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+DB_N_PLUS_ONE_TOTAL = Counter(
+    'db_n_plus_one_suspected_total',
+    'Подозрения на N+1: один и тот же SQL повторен за HTTP-запрос не реже порога',
+    ['route']
+)
+DB_SLOW_QUERIES_TOTAL = Counter('db_slow_queries_total', 'SQL запросы дольше SQL_SLOW_QUERY_SECONDS')
+
+
+class RequestSqlStats:
+    """Счетчики SQL одного HTTP-запроса"""
+
+    __slots__ = ('count', 'duration', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = ShapeCounter()  # текст SQL (с плейсхолдерами) -> сколько раз выполнен
+
+    ''' Повторяющиеся формы запросов не реже порога N+1 '''
+    def repeated(self, threshold: int):
+        return [(statement, count) for statement, count in self.shapes.most_common() if count >= threshold]
+
+
+_request_stats: ContextVar[Optional[RequestSqlStats]] = ContextVar('request_sql_stats', default=None)
+
+
+''' Статистика текущего запроса (None вне HTTP-запроса) '''
+def current_stats() -> Optional[RequestSqlStats]:
+    return _request_stats.get()
+
+
+''' Хуки на все движки: время каждого запроса в контекст HTTP-запроса + выборочный лог медленных '''
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+        stats.shapes[statement] += 1
+
+    if elapsed >= settings.SQL_SLOW_QUERY_SECONDS:
+        DB_SLOW_QUERIES_TOTAL.inc()
+        if random.random() < settings.SQL_SLOW_QUERY_SAMPLE_RATE:
+            slow_query_logger.warning('Медленный SQL (%.1f мс): %s', elapsed * 1000, statement)
+
+
+''' Ошибка запроса: снимаем отметку времени, чтобы стек не рос '''
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+
+
+class SqlStatsMiddleware:
+    """Считает SQL запросы и время БД за HTTP-запрос: заголовки X-DB-*, метрики, в DEBUG - поиск N+1"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_stats(message: Message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'x-db-queries', str(stats.count).encode()))
+                headers.append((b'x-db-time-ms', f'{stats.duration * 1000:.1f}'.encode()))
+                if settings.DEBUG:
+                    suspects = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+                    if suspects:
+                        headers.append((b'x-db-n-plus-one', str(len(suspects)).encode()))
+                message['headers'] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_stats.reset(token)
+            self._record(scope, stats)
+
+    ''' Метрики и предупреждения по завершении запроса '''
+    @staticmethod
+    def _record(scope: Scope, stats: RequestSqlStats):
+        route = scope.get('route')
+        route_name = f"{scope['method']} {route.path}" if route is not None else 'unmatched'
+
+        DB_QUERIES_PER_REQUEST.labels(route=route_name).observe(stats.count)
+        DB_TIME_PER_REQUEST.labels(route=route_name).observe(stats.duration)
+
+        if not settings.DEBUG:
+            return
+        for statement, count in stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+            DB_N_PLUS_ONE_TOTAL.labels(route=route_name).inc()
+            logger.warning(
+                'Возможный N+1 в %s: один и тот же запрос выполнен %d раз: %s',
+                route_name, count, ' '.join(statement.split())
+            )
@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+import uuid
+
+
+''' UUIDv7 (RFC 9562): 48 бит времени в мс + версия + 12-битный счетчик + вариант + 62 случайных бита.
+    Ключи растут со временем, поэтому вставки идут в правый край B-tree индекса, а не в случайные страницы '''
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+_RAND_B_MASK = (1 << 62) - 1
+_COUNTER_MAX = 0xFFF
+
+
+def uuid7() -> uuid.UUID:
+    global _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & _RAND_B_MASK
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            ''' Новая миллисекунда: счетчик со случайного значения в нижней половине (запас для инкремента) '''
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        else:
+            ''' Та же миллисекунда (или часы ушли назад): монотонно увеличиваем счетчик '''
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b
+    return uuid.UUID(int=value)
+
+
+''' Время создания из UUIDv7 (для отладки и выборок по диапазону ключей) '''
+def uuid7_time(value: uuid.UUID) -> float:
+    return (value.int >> 80) / 1000
+
+
+''' Та же схема на стороне PostgreSQL (до 18-й версии встроенной uuidv7() нет): время в мс поверх gen_random_uuid()
+    с заменой версии 4 на 7. Используется как server_default для вставок в обход ORM '''
+UUID7_SQL_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE
+"""
@@ -0,0 +1,65 @@
+"""
+Бенчмарк проверки JWT: python-jose, PyJWT (если установлен) и AuthService.decode_claims
+без кеша и с кешем декодированных токенов.
+
+БД не нужна: токен выпускается для пользователя-заглушки с нужными полями.
+
+Запуск:
+    python -m scripts.bench_jwt --iterations 20000
+"""
+import argparse
+import time
+import uuid
+from types import SimpleNamespace
+
+from jose import jwt as jose_jwt
+
+from app.config import settings
+from app.services.auth_service import AuthService
+from app.services.token_cache import token_cache
+
+
+''' Проверок в секунду и время одной проверки в микросекундах '''
+def measure(fn, iterations: int) -> tuple:
+    for _ in range(min(iterations, 500)):  # прогрев
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    return iterations / elapsed, elapsed / iterations * 1_000_000
+
+
+def uncached_decode_claims(token: str):
+    token_cache.clear()
+    return AuthService.decode_claims(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    user = SimpleNamespace(id=uuid.uuid4(), email="bench@example.com", is_admin=False, is_active=True)
+    token = AuthService.create_user_token(user)
+    key, algorithm = settings.SECRET_KEY, settings.ALGORITHM
+
+    cases = {
+        "python-jose": lambda: jose_jwt.decode(token, key, algorithms=[algorithm]),
+    }
+    try:
+        import jwt as pyjwt
+        cases["PyJWT"] = lambda: pyjwt.decode(token, key, algorithms=[algorithm])
+    except ImportError:
+        print("PyJWT не установлен (pip install pyjwt) - пропускаем\n")
+    cases["decode_claims"] = lambda: uncached_decode_claims(token)
+    cases["decode_claims+cache"] = lambda: AuthService.decode_claims(token)
+
+    print(f"{'backend':<22}{'проверок/с':>14}{'мкс':>10}")
+    for name, fn in cases.items():
+        rate, per_call = measure(fn, args.iterations)
+        print(f"{name:<22}{rate:>14.0f}{per_call:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
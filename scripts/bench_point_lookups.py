@@ -0,0 +1,71 @@
+"""
+Микробенчмарк горячих точечных запросов: Query, собираемый заново на каждый вызов,
+против закешированных lambda_stmt в сервисах.
+
+Запуск (нужна БД из DATABASE_URL хотя бы с одним товаром и пользователем):
+    python -m scripts.bench_point_lookups --iterations 5000
+"""
+import argparse
+import time
+
+from sqlalchemy import and_
+
+from app.database import SessionLocal
+from app.models import Favorites, Product, User
+from app.services.auth_service import AuthService
+from app.services.history_service import FavoritesService
+from app.services.product_service import ProductService
+
+
+''' Время одного вызова в микросекундах '''
+def per_call_us(fn, iterations: int) -> float:
+    for _ in range(min(iterations, 200)):  # прогрев: кеш компиляции, пул, prepared statements
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        product_id = db.query(Product.id).limit(1).scalar()
+        user = db.query(User.id, User.email).limit(1).first()
+        if product_id is None or user is None:
+            raise SystemExit("В БД из DATABASE_URL нужен хотя бы один товар и один пользователь")
+        user_id, email = user
+
+        ''' Пары: как было (Query на каждый вызов) и как стало '''
+        cases = {
+            "product by id": (
+                lambda: db.query(Product).filter(product_id == Product.id).first(),
+                lambda: ProductService.get_product_by_id(db, product_id),
+            ),
+            "user by email": (
+                lambda: db.query(User).filter(and_(User.email == email)).first(),
+                lambda: AuthService.get_user_by_email(db, email),
+            ),
+            "is favorite": (
+                lambda: db.query(Favorites).filter(
+                    and_(Favorites.user_id == user_id, Favorites.product_id == product_id)
+                ).first() is not None,
+                lambda: FavoritesService.is_favorite(db, user_id, product_id),
+            ),
+        }
+
+        print(f"{'lookup':<16}{'query, мкс':>14}{'cached, мкс':>14}{'разница':>10}")
+        for name, (legacy, cached) in cases.items():
+            before = per_call_us(legacy, args.iterations)
+            after = per_call_us(cached, args.iterations)
+            print(f"{name:<16}{before:>14.1f}{after:>14.1f}{(before - after) / before:>10.0%}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Бенчмарк вставок с первичным ключом UUIDv4 против UUIDv7 в локальный PostgreSQL.
+
+Для каждой стратегии создается временная таблица с индексом по ключу (как view_history),
+в нее вставляется --rows строк пачками по --batch; выводится скорость вставки и размер индекса.
+Разница растет, когда индекс перестает помещаться в shared_buffers.
+
+Запуск (PostgreSQL из DATABASE_URL):
+    python -m scripts.bench_uuid_inserts --rows 1000000 --batch 1000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.utils.uuid7 import uuid7
+
+
+STRATEGIES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+''' Вставка rows строк; возвращает (строк в секунду, размер индекса ключа в МБ) '''
+def run(strategy: str, rows: int, batch: int) -> tuple:
+    generate = STRATEGIES[strategy]
+    table = f'bench_ids_{strategy}'
+
+    with engine.connect() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS {table}'))
+        conn.execute(text(
+            f'CREATE UNLOGGED TABLE {table} ('
+            f'id UUID PRIMARY KEY, user_id UUID NOT NULL, product_id UUID NOT NULL, viewed_at TIMESTAMP NOT NULL)'
+        ))
+        conn.commit()
+
+        insert = text(f'INSERT INTO {table} (id, user_id, product_id, viewed_at) VALUES (:id, :user_id, :product_id, :viewed_at)')
+        user_id, product_id = uuid.uuid4(), uuid.uuid4()
+
+        started = time.perf_counter()
+        for offset in range(0, rows, batch):
+            now = datetime.now(timezone.utc)
+            conn.execute(insert, [
+                {'id': generate(), 'user_id': user_id, 'product_id': product_id, 'viewed_at': now}
+                for _ in range(min(batch, rows - offset))
+            ])
+            conn.commit()
+        elapsed = time.perf_counter() - started
+
+        index_mb = conn.execute(text(f"SELECT pg_relation_size('{table}_pkey')")).scalar() / 1024 / 1024
+        conn.execute(text(f'DROP TABLE {table}'))
+        conn.commit()
+
+    return rows / elapsed, index_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'strategy':<10}{'rows/s':>12}{'index, MB':>12}")
+    for strategy in STRATEGIES:
+        rate, index_mb = run(strategy, args.rows, args.batch)
+        print(f'{strategy:<10}{rate:>12.0f}{index_mb:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Общие фикстуры тестов.
+
+Тесты с БД запускаются против пустой базы PostgreSQL из TEST_DATABASE_URL: схема создается через
+create_all, заполняется тестовыми данными и удаляется после прогона. Без TEST_DATABASE_URL такие тесты пропускаются.
+"""
+import os
+from decimal import Decimal
+
+import pytest
+
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+''' Настройкам приложения нужен DATABASE_URL уже при импорте app '''
+if TEST_DATABASE_URL:
+    os.environ.setdefault('DATABASE_URL', TEST_DATABASE_URL)
+
+
+@pytest.fixture(scope='session')
+def database_url() -> str:
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL не задан')
+    return TEST_DATABASE_URL
+
+
+@pytest.fixture(scope='session')
+def engine(database_url):
+    from sqlalchemy import create_engine, inspect
+    from sqlalchemy.pool import NullPool
+    from app.database import Base
+    import app.models  # noqa: F401 - регистрирует таблицы в metadata
+
+    engine = create_engine(database_url, poolclass=NullPool)
+    if inspect(engine).get_table_names():
+        pytest.fail('TEST_DATABASE_URL должен указывать на пустую базу: тесты создают и удаляют схему')
+
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+''' Заполненная база: id и значения, по которым тесты обращаются к сервисам '''
+@pytest.fixture(scope='session')
+def seeded(engine) -> dict:
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from app.models import (
+        Cart, Favorites, GradeEnum, Order, OrderItem, OrderStatusEnum, Product, Review, ReviewHelpful, User, ViewHistory
+    )
+    from app.services.history_partitions import ViewHistoryPartitions
+
+    with Session(engine, expire_on_commit=False) as db:
+        ViewHistoryPartitions.ensure_partitions(db)
+
+        users = [
+            User(email=f'user{i}@example.com', username=f'user{i}', password_hash='x', full_name=f'User {i}')
+            for i in range(50)
+        ]
+        grades = list(GradeEnum)
+        products = [
+            Product(
+                name=f'Gundam {i}', manufacturer='Bandai', series=f'Series {i % 7}', price=Decimal(10 + i),
+                grade=grades[i % len(grades)], in_stock=i % 5
+            )
+            for i in range(200)
+        ]
+        db.add_all(users + products)
+        db.flush()
+
+        reviews = [
+            Review(user_id=user.id, product_id=products[j].id, rating=j % 5 + 1, comment='ok')
+            for i, user in enumerate(users) for j in range(i, i + 4)
+        ]
+        db.add_all(reviews)
+        db.flush()
+        db.add_all([
+            ReviewHelpful(review_id=review.id, user_id=users[(i + 1) % len(users)].id, helpful=i % 3 != 0)
+            for i, review in enumerate(reviews)
+        ])
+
+        orders = [
+            Order(
+                user_id=user.id, total_amount=Decimal(100), delivery_address='Tashkent',
+                status=list(OrderStatusEnum)[i % len(OrderStatusEnum)]
+            )
+            for i, user in enumerate(users) for _ in range(3)
+        ]
+        db.add_all(orders)
+        db.flush()
+        db.add_all([
+            OrderItem(order_id=order.id, product_id=products[(i + k) % len(products)].id, quantity=1, price=Decimal(10))
+            for i, order in enumerate(orders) for k in range(2)
+        ])
+
+        db.add_all([
+            Cart(user_id=user.id, product_id=products[(i * 3 + k) % len(products)].id, quantity=1)
+            for i, user in enumerate(users) for k in range(2)
+        ])
+        db.add_all([
+            Favorites(user_id=user.id, product_id=products[(i * 5 + k) % len(products)].id)
+            for i, user in enumerate(users) for k in range(3)
+        ])
+        db.add_all([
+            ViewHistory(user_id=user.id, product_id=products[(i * 7 + k) % len(products)].id)
+            for i, user in enumerate(users) for k in range(5)
+        ])
+        db.commit()
+
+        ''' Статистика для планировщика, как в рабочей базе '''
+        db.execute(text('ANALYZE'))
+        db.commit()
+
+        user, product = users[0], products[0]
+        return {
+            'user_id': user.id,
+            'email': user.email,
+            'product_id': product.id,
+            'review_id': reviews[0].id,
+            'order_id': orders[0].id,
+        }
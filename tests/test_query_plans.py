@@ -0,0 +1,165 @@
+"""
+Планы горячих запросов: ни один из них не должен читать свою таблицу последовательным сканированием.
+
+Проверяются не копии запросов, а SQL, который выполняют сами сервисы: каждый вызов сервиса
+на заполненной базе перехватывается (before_cursor_execute), затем каждый его SELECT проходит
+EXPLAIN с enable_seqscan = off. Если подходящий индекс есть, планировщик выберет его,
+а Seq Scan в плане означает, что индекса нет или запрос перестал под него подходить.
+"""
+import asyncio
+import inspect
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Set, Tuple
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from tests.conftest import TEST_DATABASE_URL
+
+if not TEST_DATABASE_URL:
+    pytest.skip('TEST_DATABASE_URL не задан', allow_module_level=True)
+
+from app.database import to_async_url
+from app.models import OrderStatusEnum
+from app.services.auth_service import AuthService
+from app.services.history_service import FavoritesService, HistoryService
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from app.services.review_service import ReviewService
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    tables: Set[str]  # таблицы (и их секции), которые должны читаться по индексу
+    call: Callable[[Any, Dict[str, Any]], Any]  # вызов сервиса: (сессия, seeded) -> результат или корутина
+    is_async: bool = False
+
+
+PLAN_CHECKS: List[PlanCheck] = [
+    PlanCheck('product by id', {'products'}, lambda db, s: ProductService.get_product_by_id(db, s['product_id'])),
+    PlanCheck('user by email', {'users'}, lambda db, s: AuthService.get_user_by_email(db, s['email'])),
+    PlanCheck(
+        'reviews of product', {'reviews'},
+        lambda db, s: ReviewService.get_reviews(db, product_id=s['product_id']), is_async=True
+    ),
+    PlanCheck(
+        'review stats of product', {'reviews'},
+        lambda db, s: ReviewService.get_review_stats(db, s['product_id']), is_async=True
+    ),
+    PlanCheck(
+        'review with helpful votes', {'review_helpfuls'},
+        lambda db, s: ReviewService.get_review_by_id(db, s['review_id'], current_user_id=s['user_id']), is_async=True
+    ),
+    PlanCheck('orders of user', {'orders'}, lambda db, s: OrderService.get_user_orders(db, s['user_id'])),
+    PlanCheck(
+        'pending orders of user', {'orders'},
+        lambda db, s: OrderService.count_user_orders(db, s['user_id'], status=OrderStatusEnum.PENDING)
+    ),
+    PlanCheck('items of order', {'order_items'}, lambda db, s: OrderService.get_order_items(db, s['order_id'])),
+    PlanCheck(
+        'active orders with product', {'order_items'},
+        lambda db, s: OrderService.count_active_orders_with_product(db, s['product_id'])
+    ),
+    PlanCheck('cart of user', {'cart', 'products'}, lambda db, s: OrderService.get_cart_items(db, s['user_id'])),
+    PlanCheck(
+        'product in cart', {'cart'},
+        lambda db, s: OrderService.find_cart_item(db, s['user_id'], s['product_id'])
+    ),
+    PlanCheck(
+        'product in favorites', {'favorites'},
+        lambda db, s: FavoritesService.is_favorite(db, s['user_id'], s['product_id'])
+    ),
+    PlanCheck('history of user', {'view_history'}, lambda db, s: HistoryService.get_user_history(db, s['user_id'])),
+]
+
+
+''' Все узлы плана (EXPLAIN FORMAT JSON) '''
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+''' Таблицы из списка (с учетом секций: view_history_p202610 -> view_history), прочитанные Seq Scan '''
+def seq_scanned(plan, tables: Set[str]) -> Set[str]:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scanned = set()
+    for node in plan_nodes(plan[0]['Plan']):
+        relation = node.get('Relation Name')
+        if node['Node Type'] != 'Seq Scan' or not relation:
+            continue
+        scanned.update(table for table in tables if relation == table or relation.startswith(f'{table}_'))
+    return scanned
+
+
+''' Перехват SELECT, которые выполняет движок, пока открыт контекст '''
+class CapturedStatements:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[Tuple[str, Any]] = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._capture)
+        return self.statements
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._capture)
+
+
+def explain_sync(engine: Engine, check: PlanCheck, seeded: dict) -> Set[str]:
+    with CapturedStatements(engine) as statements:
+        with Session(engine) as db:
+            check.call(db, seeded)
+    assert statements, f'{check.name}: сервис не выполнил ни одного запроса'
+
+    scanned = set()
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            for statement, parameters in statements:
+                plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+                scanned |= seq_scanned(plan, check.tables)
+            transaction.rollback()
+    return scanned
+
+
+async def explain_async(database_url: str, check: PlanCheck, seeded: dict) -> Set[str]:
+    engine = create_async_engine(to_async_url(database_url), poolclass=NullPool)
+    try:
+        with CapturedStatements(engine.sync_engine) as statements:
+            async with AsyncSession(engine) as db:
+                result = check.call(db, seeded)
+                if inspect.isawaitable(result):
+                    await result
+        assert statements, f'{check.name}: сервис не выполнил ни одного запроса'
+
+        scanned = set()
+        async with engine.connect() as conn:
+            async with conn.begin() as transaction:
+                await conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+                for statement, parameters in statements:
+                    plan = (await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', tuple(parameters))).scalar()
+                    scanned |= seq_scanned(plan, check.tables)
+                await transaction.rollback()
+        return scanned
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize('check', PLAN_CHECKS, ids=lambda check: check.name)
+def test_hot_query_uses_index(check: PlanCheck, engine, seeded, database_url):
+    if check.is_async:
+        scanned = asyncio.run(explain_async(database_url, check, seeded))
+    else:
+        scanned = explain_sync(engine, check, seeded)
+
+    assert not scanned, f'{check.name}: Seq Scan по {", ".join(sorted(scanned))}'